@@ -0,0 +1 @@
+"""Benchmark suite for the ingestion, resampling and backtesting hot paths"""
@@ -0,0 +1,134 @@
+"""
+Deterministic generators of synthetic Kraken payloads
+
+Every generator takes a seed so that two runs of the benchmark suite
+operate on byte-for-byte identical inputs.
+"""
+import numpy as np
+
+START_EPOCH = 1514764800.0  # 2018-01-01 00:00:00 UTC
+START_PRICE = 10000.0
+TRADES_CHUNK_SIZE = 1_000_000
+
+
+def _trade_chunks(n, seed, start_epoch, start_price, mean_interval):
+    rng = np.random.default_rng(seed)
+    price = start_price
+    epoch = start_epoch
+    remaining = n
+    while remaining > 0:
+        size = min(TRADES_CHUNK_SIZE, remaining)
+        prices = price * np.exp(np.cumsum(rng.normal(0.0, 2e-4, size)))
+        # kraken timestamps have a resolution of 10^-4 seconds
+        times = epoch + np.cumsum(rng.exponential(mean_interval, size))
+        times = np.round(times, 4)
+        volumes = rng.lognormal(-3.0, 1.5, size)
+        sides = rng.random(size) < 0.5
+        types = rng.random(size) < 0.7
+        yield prices, volumes, times, sides, types
+        price = prices[-1]
+        epoch = times[-1]
+        remaining -= size
+
+
+def generate_trades(
+    n, seed=0, start_epoch=START_EPOCH, start_price=START_PRICE, mean_interval=0.5
+):
+    """
+    generate_trades yields n rows shaped like the Kraken Trades endpoint result
+    [price, volume, time, buy/sell, market/limit, misc]
+    """
+    for prices, volumes, times, sides, types in _trade_chunks(
+        n, seed, start_epoch, start_price, mean_interval
+    ):
+        for p, v, t, s, m in zip(
+            prices.tolist(), volumes.tolist(), times.tolist(), sides, types
+        ):
+            yield [
+                "%.5f" % p,
+                "%.8f" % v,
+                t,
+                "b" if s else "s",
+                "l" if m else "m",
+                "",
+            ]
+
+
+def write_trades_csv(
+    path, n, seed=0, start_epoch=START_EPOCH, start_price=START_PRICE, mean_interval=0.5
+):
+    """
+    write_trades_csv writes n synthetic trades in the format of a _trades.csv file
+    Rows are produced a chunk at a time, so tens of millions of trades fit in memory
+    """
+    with open(path, "w") as f:
+        for prices, volumes, times, sides, types in _trade_chunks(
+            n, seed, start_epoch, start_price, mean_interval
+        ):
+            lines = [
+                "%.5f,%.8f,%.4f,%s,%s,\n"
+                % (p, v, t, "b" if s else "s", "l" if m else "m")
+                for p, v, t, s, m in zip(
+                    prices.tolist(),
+                    volumes.tolist(),
+                    times.tolist(),
+                    sides.tolist(),
+                    types.tolist(),
+                )
+            ]
+            f.writelines(lines)
+    return path
+
+
+def generate_depth(levels=1000, seed=0, mid=START_PRICE, epoch=START_EPOCH):
+    """
+    generate_depth returns a single pair's Depth result with `levels` asks and bids
+    {"asks": [[price, volume, timestamp], ...], "bids": [...]}
+    """
+    rng = np.random.default_rng(seed)
+    half_spread = mid * 5e-5
+    ask_prices = mid + half_spread + np.cumsum(rng.exponential(mid * 1e-5, levels))
+    bid_prices = mid - half_spread - np.cumsum(rng.exponential(mid * 1e-5, levels))
+    ask_volumes = rng.lognormal(-1.0, 1.2, levels)
+    bid_volumes = rng.lognormal(-1.0, 1.2, levels)
+    ask_epochs = int(epoch) - rng.integers(0, 3600, levels)
+    bid_epochs = int(epoch) - rng.integers(0, 3600, levels)
+    return {
+        "asks": [
+            ["%.5f" % p, "%.8f" % v, int(t)]
+            for p, v, t in zip(ask_prices, ask_volumes, ask_epochs)
+        ],
+        "bids": [
+            ["%.5f" % p, "%.8f" % v, int(t)]
+            for p, v, t in zip(bid_prices, bid_volumes, bid_epochs)
+        ],
+    }
+
+
+def generate_depth_series(
+    n, levels=1000, seed=0, start_epoch=START_EPOCH, interval=3.0
+):
+    """ generate_depth_series yields n (snapshot_epoch, depth) pairs of a drifting book """
+    rng = np.random.default_rng(seed)
+    mids = START_PRICE * np.exp(np.cumsum(rng.normal(0.0, 5e-4, n)))
+    for i, mid in enumerate(mids.tolist()):
+        epoch = start_epoch + i * interval
+        yield epoch, generate_depth(levels, seed + i, mid, epoch)
+
+
+def write_ohlcv_csv(path, n, seed=0, start_epoch=START_EPOCH, interval=60):
+    """
+    write_ohlcv_csv writes n synthetic candles in the format produced by resample_trade_data
+    [interval_start, open, high, low, close, volume]
+    """
+    rng = np.random.default_rng(seed)
+    closes = START_PRICE * np.exp(np.cumsum(rng.normal(0.0, 1e-3, n)))
+    opens = np.concatenate(([START_PRICE], closes[:-1]))
+    wick = np.abs(rng.normal(0.0, 5e-4, (2, n)))
+    highs = np.maximum(opens, closes) * (1 + wick[0])
+    lows = np.minimum(opens, closes) * (1 - wick[1])
+    volumes = rng.lognormal(1.0, 1.0, n)
+    epochs = start_epoch + interval * np.arange(1, n + 1)
+    data = np.column_stack((epochs, opens, highs, lows, closes, volumes))
+    np.savetxt(path, data, fmt="%.1f,%.5f,%.5f,%.5f,%.5f,%.8f")
+    return path
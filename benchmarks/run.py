@@ -0,0 +1,631 @@
+#!/usr/bin/env python
+"""
+Runs the benchmark suite and records the timings to json
+
+Usage:
+    python benchmarks/run.py --scale small --output bench.json
+    python benchmarks/run.py --scale large --compare bench.json --threshold 0.15
+
+Each benchmark builds its synthetic inputs in a temporary data folder outside
+of the timed section. When --compare is given, benchmarks whose median time
+grew by more than --threshold relative to the baseline are flagged and the
+process exits with a non-zero status.
+"""
+import argparse
+import contextlib
+import datetime
+import gc
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIRECTORY, "crypto"))
+sys.path.insert(0, ROOT_DIRECTORY)
+
+from benchmarks import generators  # noqa: E402
+
+PAIR = "XXBTZUSD"
+
+SCALES = {
+    "small": {"trades": 200_000, "snapshots": 50, "levels": 1000, "candles": 50_000},
+    "medium": {
+        "trades": 2_000_000,
+        "snapshots": 200,
+        "levels": 1000,
+        "candles": 500_000,
+    },
+    "large": {
+        "trades": 20_000_000,
+        "snapshots": 1000,
+        "levels": 1000,
+        "candles": 2_000_000,
+    },
+}
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    benchmark registers a setup function under name
+    The setup function takes the run context and returns (timed callable, item count)
+    optionally followed by a dict of extra measurements to record
+    """
+
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+class Context(object):
+    """ Context holds the scale of a run and lazily generated input files """
+
+    def __init__(self, scale, workdir, seed):
+        self.scale = SCALES[scale]
+        self.workdir = workdir
+        self.seed = seed
+        self._files = {}
+
+    def path(self, filename):
+        return os.path.join(self.workdir, filename)
+
+    def trades_csv(self):
+        from utils import consts
+
+        if "trades" not in self._files:
+            self._files["trades"] = generators.write_trades_csv(
+                self.path(PAIR + consts.TRADES_AFFIX), self.scale["trades"], self.seed
+            )
+        return self._files["trades"]
+
+    def ohlcv_csv(self):
+        from utils import consts
+
+        if "ohlcv" not in self._files:
+            self._files["ohlcv"] = generators.write_ohlcv_csv(
+                self.path(PAIR + "_M1" + consts.OHLCV_AFFIX),
+                self.scale["candles"],
+                self.seed,
+            )
+        return self._files["ohlcv"]
+
+    def depths(self):
+        if "depths" not in self._files:
+            self._files["depths"] = list(
+                generators.generate_depth_series(
+                    self.scale["snapshots"], self.scale["levels"], self.seed
+                )
+            )
+        return self._files["depths"]
+
+
+@benchmark("process_raw_orderbook")
+def bench_process_raw_orderbook(ctx):
+    from get_orderbook import process_raw_orderbook
+
+    depths = ctx.depths()
+
+    def run():
+        for _, depth in depths:
+            process_raw_orderbook(PAIR, depth)
+
+    return run, len(depths)
+
+
+@benchmark("dao_bulk_insert_raw_orderbook")
+def bench_bulk_insert_raw_orderbook(ctx):
+    from database import DAO
+    from get_orderbook import process_raw_orderbook
+
+    batches = [process_raw_orderbook(PAIR, depth) for _, depth in ctx.depths()]
+    dao = DAO(ctx.path("bench.db"))
+
+    def run():
+        dao.drop_tables()
+        dao.create_tables()
+        for columns in batches:
+            dao.bulk_insert_raw_orderbook(columns)
+
+    return run, len(batches)
+
+
+@benchmark("dao_insert_orderbook_snapshot")
+def bench_insert_orderbook_snapshot(ctx):
+    from database import DAO
+    from get_orderbook import process_raw_orderbook
+
+    snapshots = [process_raw_orderbook(PAIR, depth) for _, depth in ctx.depths()]
+    dao = DAO(ctx.path("bench.db"))
+
+    def run():
+        dao.drop_tables()
+        dao.create_tables()
+        for snapshot in snapshots:
+            dao.insert_orderbook_snapshot(snapshot)
+
+    return run, len(snapshots)
+
+
+def _legacy_orderbook_rows(pair, res, snapshot_epoch):
+    # the per level row layout process_raw_orderbook used to build
+    columns = []
+    for ask in res["asks"]:
+        columns.append(
+            [pair, float(ask[0]), float(ask[1]), True, ask[2], snapshot_epoch]
+        )
+    for bid in res["bids"]:
+        columns.append(
+            [pair, float(bid[0]), float(bid[1]), False, bid[2], snapshot_epoch]
+        )
+    return columns
+
+
+def _measure_allocations(build, depths):
+    """ returns the live blocks retained and the peak bytes allocated per snapshot """
+    gc.collect()
+    gc.disable()
+    try:
+        tracemalloc.start()
+        blocks = sys.getallocatedblocks()
+        held = [build(PAIR, depth, epoch) for epoch, depth in depths]
+        blocks = sys.getallocatedblocks() - blocks
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        gc.enable()
+    del held
+    return {
+        "blocks_per_snapshot": blocks / len(depths),
+        "peak_bytes_per_snapshot": peak / len(depths),
+    }
+
+
+@benchmark("orderbook_snapshot_allocations")
+def bench_orderbook_snapshot_allocations(ctx):
+    from orderbook import OrderbookSnapshot
+
+    depths = ctx.depths()
+    legacy = _measure_allocations(_legacy_orderbook_rows, depths)
+    snapshot = _measure_allocations(OrderbookSnapshot.from_depth, depths)
+    extra = {
+        "legacy_rows": legacy,
+        "snapshot": snapshot,
+        "block_reduction": legacy["blocks_per_snapshot"]
+        / max(snapshot["blocks_per_snapshot"], 1),
+    }
+
+    def run():
+        for epoch, depth in depths:
+            OrderbookSnapshot.from_depth(PAIR, depth, epoch)
+
+    return run, len(depths), extra
+
+
+@benchmark("orderbook_features")
+def bench_orderbook_features(ctx):
+    from analytics import iter_feature_chunks
+    from database import DAO
+    from get_orderbook import process_raw_orderbook
+    from utils import Timeframe
+
+    dao = DAO(ctx.path("features.db"))
+    dao.create_tables()
+    dao.bulk_insert_orderbook_snapshots(
+        process_raw_orderbook(PAIR, depth) for _, depth in ctx.depths()
+    )
+
+    def run():
+        for _ in iter_feature_chunks(dao, PAIR, timeframe=Timeframe.M1):
+            pass
+
+    return run, len(ctx.depths())
+
+
+@benchmark("sign_private_request")
+def bench_sign_private_request(ctx):
+    import base64
+    import hashlib
+    import hmac
+    import urllib.parse
+
+    import kraken
+
+    api = kraken.API("key", base64.b64encode(b"0" * 64).decode())
+    count = 20_000
+    urlpath = "/0/private/AddOrder"
+    data = {"pair": PAIR, "type": "buy", "ordertype": "market", "volume": "1.0"}
+
+    def legacy_sign(data, urlpath):
+        # the previous _sign, which decoded the secret and keyed a new hmac every call
+        postdata = urllib.parse.urlencode(data)
+        encoded = (str(data["nonce"]) + postdata).encode()
+        message = urlpath.encode() + hashlib.sha256(encoded).digest()
+        signature = hmac.new(base64.b64decode(api.secret), message, hashlib.sha512)
+        return base64.b64encode(signature.digest()).decode()
+
+    start = time.perf_counter()
+    for _ in range(count):
+        data["nonce"] = api._nonce()
+        legacy_sign(data, urlpath)
+    extra = {"legacy_seconds": time.perf_counter() - start}
+
+    def run():
+        for _ in range(count):
+            data["nonce"] = api._nonce()
+            api._sign(data, urlpath)
+
+    return run, count, extra
+
+
+@benchmark("paper_market_orders")
+def bench_paper_market_orders(ctx):
+    from orderbook import OrderbookSnapshot
+    from trading import OrderManager, PaperExecutor, BUY, SELL
+
+    snapshots = [
+        OrderbookSnapshot.from_depth(PAIR, depth, epoch)
+        for epoch, depth in ctx.depths()
+    ]
+    extra = {}
+
+    def run():
+        manager = OrderManager(PaperExecutor(cash=1e12, positions={PAIR: 1e6}))
+
+        def trade(snapshot):
+            manager.submit(PAIR, BUY, 0.5)
+            manager.submit(PAIR, SELL, 0.5)
+
+        manager.executor.replay(snapshots, trade)
+        extra.update(manager.latency_stats())
+
+    run()
+    return run, 2 * len(snapshots), extra
+
+
+@benchmark("aggregate_ohlcv")
+def bench_aggregate_ohlcv(ctx):
+    import csv
+    import itertools
+
+    from parse_trade_history import aggregate_ohlcv
+
+    # an hour worth of trades per aggregate at the default trade frequency
+    n = min(ctx.scale["trades"], 1_000_000)
+    with open(ctx.trades_csv(), "r") as f:
+        rows = list(itertools.islice(csv.reader(f), n))
+    buckets = [rows[i : i + 7200] for i in range(0, len(rows), 7200)]
+
+    def run():
+        for bucket in buckets:
+            aggregate_ohlcv(bucket)
+
+    return run, len(rows)
+
+
+@benchmark("resample_trade_data")
+def bench_resample_trade_data(ctx):
+    from parse_trade_history import resample_trade_data
+    from utils import Timeframe
+
+    ctx.trades_csv()
+
+    def run():
+        resample_trade_data(PAIR, Timeframe.M1)
+
+    return run, ctx.scale["trades"]
+
+
+@benchmark("kraken_csv_data")
+def bench_kraken_csv_data(ctx):
+    import backtrader as bt
+
+    from backtest.feeds.kraken_csv_feed import KrakenCSVData
+
+    path = ctx.ohlcv_csv()
+
+    def run():
+        cerebro = bt.Cerebro(stdstats=False)
+        cerebro.adddata(
+            KrakenCSVData(dataname=path, timeframe=bt.TimeFrame.Minutes, compression=1)
+        )
+        cerebro.run()
+
+    return run, ctx.scale["candles"]
+
+
+@benchmark("test_strategy_backtest")
+def bench_test_strategy_backtest(ctx):
+    import backtrader as bt
+
+    from backtest.feeds.kraken_csv_feed import KrakenCSVData
+    from backtest.strategies.test_strategy import TestStrategy
+
+    path = ctx.ohlcv_csv()
+
+    def run():
+        cerebro = bt.Cerebro()
+        cerebro.broker.set_cash(100000)
+        cerebro.addstrategy(TestStrategy, printlog=False)
+        data = KrakenCSVData(
+            dataname=path, timeframe=bt.TimeFrame.Minutes, compression=1
+        )
+        cerebro.resampledata(data, timeframe=bt.TimeFrame.Minutes, compression=60)
+        cerebro.addsizer(bt.sizers.PercentSizer, percents=10)
+        cerebro.broker.setcommission(commission=0.001)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cerebro.run()
+
+    return run, ctx.scale["candles"]
+
+
+@benchmark("portfolio_backtest")
+def bench_portfolio_backtest(ctx):
+    from backtest import portfolio
+    from utils import consts, pairs
+
+    for seed, pair in enumerate(pairs.ALL_PAIRS):
+        generators.write_ohlcv_csv(
+            ctx.path(pair + "_M1" + consts.OHLCV_AFFIX), ctx.scale["candles"], seed
+        )
+
+    def backtest(pair_names):
+        matrix = portfolio.load_matrix(pair_names, seconds=3600)
+        signals = portfolio.sma_crossover(matrix, fast=1, slow=15)
+        portfolio.simulate(matrix, portfolio.equal_weights(signals, max_weight=0.1))
+
+    # warms the prepared candle cache, then times a single pair for comparison
+    backtest(pairs.ALL_PAIRS)
+    start = time.perf_counter()
+    backtest(pairs.ALL_PAIRS[:1])
+    extra = {
+        "pairs": len(pairs.ALL_PAIRS),
+        "single_pair_seconds": time.perf_counter() - start,
+    }
+
+    def run():
+        backtest(pairs.ALL_PAIRS)
+
+    return run, ctx.scale["candles"] * len(pairs.ALL_PAIRS), extra
+
+
+@benchmark("walk_forward")
+def bench_walk_forward(ctx):
+    import backtrader as bt
+
+    from backtest import walkforward
+    from backtest.feeds.kraken_csv_feed import KrakenCSVData
+    from backtest.feeds.prepared import prepare_candles
+    from backtest.strategies.test_strategy import TestStrategy
+
+    path = ctx.ohlcv_csv()
+    candles = prepare_candles(path, seconds=3600)
+    windows = walkforward.walk_forward_windows(
+        candles["datetime"], train=7 * 86400, test=2 * 86400, step=2 * 86400
+    )
+    grid = [{"maperiod": period, "printlog": False} for period in (10, 15, 30)]
+
+    # one window the way a cerebro.run() per window would do it, reparsing the csv
+    window = windows[0]
+    start = time.perf_counter()
+    cerebro = bt.Cerebro()
+    data = KrakenCSVData(
+        dataname=path,
+        timeframe=bt.TimeFrame.Minutes,
+        compression=1,
+        fromdate=datetime.datetime.utcfromtimestamp(candles["datetime"][window.start]),
+        todate=datetime.datetime.utcfromtimestamp(candles["datetime"][window.split]),
+    )
+    cerebro.resampledata(data, timeframe=bt.TimeFrame.Minutes, compression=60)
+    cerebro.addstrategy(TestStrategy, **grid[0])
+    with contextlib.redirect_stdout(io.StringIO()):
+        cerebro.run()
+    extra = {
+        "windows": len(windows),
+        "legacy_backtest_seconds": time.perf_counter() - start,
+    }
+
+    def run():
+        runner = walkforward.WindowRunner(candles, compression=60, use_cache=False)
+        walkforward.walk_forward(runner, TestStrategy, grid, windows, warmup=30)
+        extra["backtests"] = runner.misses
+
+    return run, len(windows), extra
+
+
+def _bench_main_start(warm):
+    def setup(ctx):
+        import shutil
+
+        from backtest.feeds.prepared import CACHE_DIRECTORY
+
+        ctx.ohlcv_csv()
+        command = [sys.executable, os.path.join(ROOT_DIRECTORY, "crypto", "main.py")]
+        command += ["--pair", PAIR, "--quiet"]
+        cache = ctx.path(CACHE_DIRECTORY)
+        shutil.rmtree(cache, ignore_errors=True)
+        if warm:
+            subprocess.run(command, check=True, capture_output=True)
+
+        def run():
+            if not warm:
+                shutil.rmtree(cache, ignore_errors=True)
+            subprocess.run(command, check=True, capture_output=True)
+
+        return run, ctx.scale["candles"]
+
+    return setup
+
+
+# a whole `python crypto/main.py` run, with and without the prepared feed cache
+benchmark("main_cold_start")(_bench_main_start(warm=False))
+benchmark("main_warm_start")(_bench_main_start(warm=True))
+
+
+def _bench_archive(codec):
+    def setup(ctx):
+        import archive
+        from archive.archive import ARCHIVE_DIRECTORY
+
+        if codec not in archive.available_codecs():
+            raise ImportError("codec %s is not installed" % codec)
+        ctx.trades_csv()
+        # every codec archives the whole csv, which is kept for the next one
+        shutil.rmtree(ctx.path(ARCHIVE_DIRECTORY), ignore_errors=True)
+        start = time.perf_counter()
+        entries = archive.archive_trades(PAIR, codec, prune=False)
+        archive_seconds = time.perf_counter() - start
+        raw = sum(entry["raw_bytes"] for entry in entries)
+        compressed = sum(entry["compressed_bytes"] for entry in entries)
+        extra = {
+            "codec": codec,
+            "archive_seconds": archive_seconds,
+            "raw_bytes": raw,
+            "compressed_bytes": compressed,
+            "compression_ratio": raw / compressed,
+        }
+
+        def run():
+            with archive.open_range(PAIR, archive.TRADES) as stream:
+                for _ in stream:
+                    pass
+
+        return run, ctx.scale["trades"], extra
+
+    return setup
+
+
+for _codec in ("zstd", "lz4", "zlib"):
+    # decode throughput in bytes per second is raw_bytes / median_seconds
+    benchmark("archive_decode_" + _codec)(_bench_archive(_codec))
+
+
+def time_benchmark(setup, ctx, repeat):
+    run, items, *extra = setup(ctx)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    result = {
+        "items": items,
+        "repeat": repeat,
+        "min_seconds": min(timings),
+        "median_seconds": median,
+        "items_per_second": items / median if median else None,
+    }
+    if extra:
+        result.update(extra[0])
+    return result
+
+
+def run_suite(scale, names, repeat, seed):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ["CRYPTO_DATA_DIR"] = workdir
+        ctx = Context(scale, workdir, seed)
+        for name in names:
+            logging.info("Running benchmark %s at scale %s", name, scale)
+            try:
+                results[name] = time_benchmark(BENCHMARKS[name], ctx, repeat)
+            except ImportError as e:
+                logging.warning("Skipping benchmark %s: %s", name, e)
+                results[name] = {"skipped": str(e)}
+                continue
+            logging.info(
+                "%s: median %.4fs over %d runs",
+                name,
+                results[name]["median_seconds"],
+                repeat,
+            )
+    return results
+
+
+def get_metadata(scale, seed):
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIRECTORY, stderr=subprocess.DEVNULL
+        )
+        commit = commit.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "scale": scale,
+        "seed": seed,
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.datetime.utcnow().isoformat(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """ compare returns the names of benchmarks that regressed against the baseline """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "median_seconds" not in base or "median_seconds" not in result:
+            continue
+        ratio = result["median_seconds"] / base["median_seconds"]
+        result["baseline_ratio"] = ratio
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            logging.warning(
+                "REGRESSION %s: %.4fs vs baseline %.4fs (x%.2f)",
+                name,
+                result["median_seconds"],
+                base["median_seconds"],
+                ratio,
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="baseline json to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument(
+        "benchmarks", nargs="*", help="benchmarks to run, all of them by default"
+    )
+    args = parser.parse_args(argv)
+
+    names = args.benchmarks or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error("unknown benchmarks: " + ", ".join(unknown))
+
+    results = run_suite(args.scale, names, args.repeat, args.seed)
+    report = {"metadata": get_metadata(args.scale, args.seed), "results": results}
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, "r") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        report["regressions"] = regressions
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    logging.info("Wrote benchmark results to %s", args.output)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
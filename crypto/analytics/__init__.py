@@ -0,0 +1,23 @@
+"""
+Batch analytics over collected market data
+"""
+
+from .orderbook_features import (
+    FEATURE_COLUMNS,
+    compute_features,
+    align_to_candles,
+    iter_snapshots,
+    iter_feature_chunks,
+    compute_feature_series,
+    write_feature_series,
+)
+
+__all__ = [
+    "FEATURE_COLUMNS",
+    "compute_features",
+    "align_to_candles",
+    "iter_snapshots",
+    "iter_feature_chunks",
+    "compute_feature_series",
+    "write_feature_series",
+]
@@ -0,0 +1,261 @@
+import heapq
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from database import DAO, DB_NAME
+from utils import get_data_path, Timeframe
+
+FEATURE_COLUMNS = [
+    "interval_start",
+    "snapshot_epoch",
+    "mid",
+    "spread",
+    "microprice",
+    "imbalance",
+    "bid_depth",
+    "ask_depth",
+]
+FEATURE_DTYPE = np.dtype([(column, "<f8") for column in FEATURE_COLUMNS])
+FEATURES_AFFIX = "_orderbook_features.csv"
+
+DEFAULT_IMBALANCE_LEVELS = 10
+DEFAULT_DEPTH_BPS = 10.0
+DEFAULT_CHUNK_SIZE = 500
+SECONDS_PER_DAY = 86400
+
+
+def _stack_levels(snapshots):
+    """
+    _stack_levels pads the asks and bids of every snapshot into (snapshots, levels) matrices
+    Missing levels have a NaN price and a zero volume
+    """
+    n = len(snapshots)
+    ask_counts = np.array([s.ask_count for s in snapshots], dtype=np.int64)
+    lengths = np.array([len(s) for s in snapshots], dtype=np.int64)
+    bid_counts = lengths - ask_counts
+    width = max(int(ask_counts.max(initial=0)), int(bid_counts.max(initial=0)), 1)
+
+    ask_px = np.full((n, width), np.nan)
+    bid_px = np.full((n, width), np.nan)
+    ask_vol = np.zeros((n, width))
+    bid_vol = np.zeros((n, width))
+    if not lengths.sum():
+        return ask_px, ask_vol, bid_px, bid_vol
+
+    levels = np.concatenate([s.levels for s in snapshots])
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    rows = np.repeat(np.arange(n), lengths)
+    position = np.arange(len(levels)) - starts
+    asks_in_row = np.repeat(ask_counts, lengths)
+    is_ask = position < asks_in_row
+    is_bid = ~is_ask
+
+    ask_px[rows[is_ask], position[is_ask]] = levels["price"][is_ask]
+    ask_vol[rows[is_ask], position[is_ask]] = levels["volume"][is_ask]
+    bid_columns = position[is_bid] - asks_in_row[is_bid]
+    bid_px[rows[is_bid], bid_columns] = levels["price"][is_bid]
+    bid_vol[rows[is_bid], bid_columns] = levels["volume"][is_bid]
+    return ask_px, ask_vol, bid_px, bid_vol
+
+
+def compute_features(
+    snapshots, imbalance_levels=DEFAULT_IMBALANCE_LEVELS, depth_bps=DEFAULT_DEPTH_BPS
+):
+    """
+    compute_features returns one FEATURE_DTYPE row per snapshot
+    mid, spread and microprice come from the top of the book,
+    imbalance is (bid volume - ask volume) / total volume over the first imbalance_levels,
+    bid_depth and ask_depth are the volumes quoted within depth_bps of the mid
+    interval_start is left as NaN, see align_to_candles
+    """
+    snapshots = list(snapshots)
+    features = np.full(len(snapshots), np.nan, dtype=FEATURE_DTYPE)
+    if not snapshots:
+        return features
+    features["snapshot_epoch"] = [s.snapshot_epoch for s in snapshots]
+
+    ask_px, ask_vol, bid_px, bid_vol = _stack_levels(snapshots)
+    best_ask, best_bid = ask_px[:, 0], bid_px[:, 0]
+    top_ask_vol, top_bid_vol = ask_vol[:, 0], bid_vol[:, 0]
+    mid = (best_ask + best_bid) / 2
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        features["mid"] = mid
+        features["spread"] = best_ask - best_bid
+        features["microprice"] = (best_bid * top_ask_vol + best_ask * top_bid_vol) / (
+            top_bid_vol + top_ask_vol
+        )
+
+        bids = bid_vol[:, :imbalance_levels].sum(axis=1)
+        asks = ask_vol[:, :imbalance_levels].sum(axis=1)
+        features["imbalance"] = (bids - asks) / (bids + asks)
+
+        band = (mid * depth_bps / 10000)[:, None]
+        features["bid_depth"] = np.where(bid_px >= mid[:, None] - band, bid_vol, 0).sum(
+            1
+        )
+        features["ask_depth"] = np.where(ask_px <= mid[:, None] + band, ask_vol, 0).sum(
+            1
+        )
+    return features
+
+
+def align_to_candles(features, timeframe):
+    """
+    align_to_candles labels each row with the candle it falls in, the same way
+    seek_interval_start labels trades, and keeps the last snapshot of every candle
+    """
+    if not len(features):
+        return features
+    seconds = timeframe.to_seconds()
+    epochs = np.ceil(features["snapshot_epoch"])
+    features["interval_start"] = epochs - epochs % seconds + seconds
+
+    # snapshots are ordered, so the last row of each run of equal labels wins
+    labels = features["interval_start"]
+    last = np.append(labels[1:] != labels[:-1], True)
+    return features[last]
+
+
+def _merge_aligned(chunks):
+    """ _merge_aligned concatenates aligned chunks, keeping the later row of a shared candle """
+    previous = None
+    for chunk in chunks:
+        if not len(chunk):
+            continue
+        if previous is not None:
+            if previous[-1]["interval_start"] == chunk[0]["interval_start"]:
+                previous = previous[:-1]
+            yield previous
+        previous = chunk
+    if previous is not None:
+        yield previous
+
+
+def iter_snapshots(dao, pair, start=None, end=None):
+    """
+    iter_snapshots yields pair's snapshots from orderbook_snapshot and from the
+    raw_orderbook history collected before it, oldest first
+    raw_orderbook is only read before the oldest orderbook_snapshot of pair, so once
+    DAO.migrate_raw_orderbook has copied it over it is not read at all
+    A snapshot stored in both is yielded once
+    """
+    raw_end = dao.first_orderbook_snapshot_epoch(pair)
+    if raw_end is None or (end is not None and end < raw_end):
+        raw_end = end
+    merged = heapq.merge(
+        dao.iter_orderbook_snapshots(pair, start, end),
+        dao.iter_raw_orderbook_snapshots(pair, start, raw_end),
+        key=lambda snapshot: snapshot.snapshot_epoch,
+    )
+    previous = None
+    for snapshot in merged:
+        if snapshot.snapshot_epoch != previous:
+            yield snapshot
+        previous = snapshot.snapshot_epoch
+
+
+def iter_feature_chunks(
+    dao,
+    pair,
+    start=None,
+    end=None,
+    timeframe=None,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    imbalance_levels=DEFAULT_IMBALANCE_LEVELS,
+    depth_bps=DEFAULT_DEPTH_BPS,
+):
+    """
+    iter_feature_chunks streams snapshots out of the DAO chunk_size at a time,
+    so memory stays bounded regardless of the length of the history
+    When a timeframe is given the chunks are aligned to its candles
+    """
+    snapshots = iter_snapshots(dao, pair, start, end)
+
+    def chunks():
+        while True:
+            chunk = list(itertools.islice(snapshots, chunk_size))
+            if not chunk:
+                return
+            features = compute_features(chunk, imbalance_levels, depth_bps)
+            if timeframe is not None:
+                features = align_to_candles(features, timeframe)
+            yield features
+
+    if timeframe is None:
+        return chunks()
+    return _merge_aligned(chunks())
+
+
+def _compute_day(
+    database, pair, start, end, timeframe, chunk_size, imbalance_levels, depth_bps
+):
+    dao = DAO(database)
+    try:
+        chunks = list(
+            iter_feature_chunks(
+                dao,
+                pair,
+                start,
+                end,
+                timeframe,
+                chunk_size,
+                imbalance_levels,
+                depth_bps,
+            )
+        )
+    finally:
+        dao.close()
+    logging.info("Computed orderbook features for %s from %d to %d", pair, start, end)
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=FEATURE_DTYPE)
+
+
+def compute_feature_series(
+    pair,
+    start,
+    end,
+    timeframe=Timeframe.M1,
+    database=DB_NAME,
+    processes=None,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    imbalance_levels=DEFAULT_IMBALANCE_LEVELS,
+    depth_bps=DEFAULT_DEPTH_BPS,
+):
+    """
+    compute_feature_series yields the candle aligned features of pair in [start, end)
+    one day at a time, with the days computed by `processes` worker processes
+    processes=None computes every day in this process
+    """
+    days = np.arange(start - start % SECONDS_PER_DAY, end, SECONDS_PER_DAY).tolist()
+    ranges = [(max(day, start), min(day + SECONDS_PER_DAY, end)) for day in days]
+    args = [
+        (database, pair, s, e, timeframe, chunk_size, imbalance_levels, depth_bps)
+        for s, e in ranges
+    ]
+
+    if not processes:
+        return _merge_aligned(_compute_day(*arg) for arg in args)
+
+    def parallel():
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            # map keeps the days in order while they are computed concurrently
+            yield from executor.map(_compute_day, *zip(*args))
+
+    return _merge_aligned(parallel())
+
+
+def write_feature_series(pair, start, end, timeframe=Timeframe.M1, **kwargs):
+    """
+    write_feature_series writes the features next to the pair's ohlcv file
+    in the FEATURE_COLUMNS order, one row per candle
+    """
+    output_csv_path = get_data_path(pair + "_" + str(timeframe) + FEATURES_AFFIX)
+    logging.info(f"Writing orderbook features of {pair} to {output_csv_path}")
+    with open(output_csv_path, "w") as f:
+        for chunk in compute_feature_series(pair, start, end, timeframe, **kwargs):
+            rows = chunk.view(np.float64).reshape(-1, len(FEATURE_COLUMNS))
+            np.savetxt(f, rows, fmt="%.10g", delimiter=",")
+    return output_csv_path
@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+from analytics import (
+    align_to_candles,
+    compute_features,
+    compute_feature_series,
+    iter_feature_chunks,
+    iter_snapshots,
+)
+from database import DAO
+from orderbook import OrderbookSnapshot
+from utils import Timeframe
+
+PAIR = "XXBTZUSD"
+DEPTH = {
+    "asks": [["101.0", "1.0", 0], ["101.5", "2.0", 0], ["110.0", "5.0", 0]],
+    "bids": [["99.0", "3.0", 0], ["98.0", "4.0", 0]],
+}
+
+
+def make_snapshots(epochs):
+    return [OrderbookSnapshot.from_depth(PAIR, DEPTH, epoch) for epoch in epochs]
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "features.db")
+    dao = DAO(path)
+    dao.create_tables()
+    # two days of snapshots every 25 seconds
+    dao.bulk_insert_orderbook_snapshots(make_snapshots(np.arange(0, 172800, 25.0)))
+    dao.close()
+    return path
+
+
+def test_compute_features():
+    features = compute_features(
+        make_snapshots([1.0]), imbalance_levels=2, depth_bps=200
+    )
+    row = features[0]
+    assert row["mid"] == 100.0
+    assert row["spread"] == 2.0
+    assert row["microprice"] == pytest.approx((99.0 * 1.0 + 101.0 * 3.0) / 4.0)
+    assert row["imbalance"] == pytest.approx((7.0 - 3.0) / 10.0)
+    # 200 bps of 100 is [98, 102]
+    assert row["bid_depth"] == 7.0
+    assert row["ask_depth"] == 3.0
+
+
+def test_compute_features_one_sided_book():
+    snapshot = OrderbookSnapshot.from_depth(
+        PAIR, {"asks": DEPTH["asks"], "bids": []}, 1.0
+    )
+    features = compute_features([snapshot])
+    assert np.isnan(features[0]["mid"])
+    assert features[0]["imbalance"] == -1.0
+
+
+def test_align_to_candles_keeps_last_snapshot():
+    features = align_to_candles(
+        compute_features(make_snapshots([1, 30, 59, 61])), Timeframe.M1
+    )
+    assert features["interval_start"].tolist() == [60.0, 120.0]
+    assert features["snapshot_epoch"].tolist() == [59.0, 61.0]
+
+
+def test_chunks_match_single_pass(database):
+    dao = DAO(database)
+    chunked = np.concatenate(
+        list(iter_feature_chunks(dao, PAIR, timeframe=Timeframe.M5, chunk_size=7))
+    )
+    whole = np.concatenate(
+        list(iter_feature_chunks(dao, PAIR, timeframe=Timeframe.M5, chunk_size=10 ** 6))
+    )
+    dao.close()
+    np.testing.assert_array_equal(chunked, whole)
+    assert len(np.unique(chunked["interval_start"])) == len(chunked)
+
+
+def test_parallel_days_match_sequential(database):
+    sequential = np.concatenate(
+        list(compute_feature_series(PAIR, 0, 172800, Timeframe.M1, database=database))
+    )
+    parallel = np.concatenate(
+        list(
+            compute_feature_series(
+                PAIR, 0, 172800, Timeframe.M1, database=database, processes=2
+            )
+        )
+    )
+    np.testing.assert_array_equal(sequential, parallel)
+    assert len(sequential) == 172800 // 60
+
+
+def test_raw_orderbook_history_is_included(tmp_path):
+    dao = DAO(str(tmp_path / "raw.db"))
+    dao.create_tables()
+    for snapshot in make_snapshots([0.0, 25.0, 50.0]):
+        dao.bulk_insert_raw_orderbook(snapshot)
+    # 50 is in both tables, as it is after a migration
+    dao.bulk_insert_orderbook_snapshots(make_snapshots([50.0, 75.0]))
+
+    epochs = [s.snapshot_epoch for s in iter_snapshots(dao, PAIR)]
+    assert epochs == [0.0, 25.0, 50.0, 75.0]
+    features = np.concatenate(list(iter_feature_chunks(dao, PAIR, chunk_size=2)))
+    assert features["snapshot_epoch"].tolist() == epochs
+    dao.close()
+
+
+def test_migrated_raw_orderbook_is_not_read(tmp_path):
+    dao = DAO(str(tmp_path / "raw.db"))
+    dao.create_tables()
+    for snapshot in make_snapshots([0.0, 25.0, 50.0]):
+        dao.bulk_insert_raw_orderbook(snapshot)
+    assert dao.migrate_raw_orderbook() == 3
+
+    plan = " ".join(
+        row[-1]
+        for row in dao._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM raw_orderbook"
+            " WHERE pair = ? AND snapshot_epoch < ?",
+            (PAIR, 0.0),
+        )
+    )
+    assert "raw_orderbook_pair_epoch" in plan
+    # only the history older than orderbook_snapshot's is read from raw_orderbook
+    dao.bulk_insert_raw_orderbook(make_snapshots([10.0])[0])
+    epochs = [s.snapshot_epoch for s in iter_snapshots(dao, PAIR)]
+    assert epochs == [0.0, 25.0, 50.0]
+    dao.close()
@@ -0,0 +1,34 @@
+"""
+Compressed, month partitioned archives of trade and ohlcv history
+"""
+
+from .codecs import available_codecs, get_codec
+from .archive import (
+    TRADES,
+    ohlcv_kind,
+    archive_trades,
+    archive_ohlcv,
+    last_archived_time,
+    load_manifest,
+    select_partitions,
+    first_row_time,
+    open_range,
+    open_trades,
+    iter_rows,
+)
+
+__all__ = [
+    "available_codecs",
+    "get_codec",
+    "TRADES",
+    "ohlcv_kind",
+    "archive_trades",
+    "archive_ohlcv",
+    "last_archived_time",
+    "load_manifest",
+    "select_partitions",
+    "first_row_time",
+    "open_range",
+    "open_trades",
+    "iter_rows",
+]
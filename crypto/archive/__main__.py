@@ -0,0 +1,52 @@
+"""
+Command line entry point for archiving, run from the crypto folder:
+
+    python -m archive trades XXBTZUSD XETHZUSD
+    python -m archive ohlcv XXBTZUSD --timeframe M1 --codec zlib
+"""
+
+import argparse
+import logging
+
+from utils import Timeframe
+from .archive import archive_trades, archive_ohlcv
+from .codecs import PREFERENCE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="archive", description=__doc__)
+    parser.add_argument("kind", choices=["trades", "ohlcv"])
+    parser.add_argument("pairs", nargs="+")
+    parser.add_argument(
+        "--timeframe", default="M1", choices=[timeframe.name for timeframe in Timeframe]
+    )
+    parser.add_argument(
+        "--codec", choices=PREFERENCE, help="defaults to the best installed"
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="remove the archived months that have ended from _trades.csv",
+    )
+    args = parser.parse_args(argv)
+
+    for pair in args.pairs:
+        if args.kind == "trades":
+            entries = archive_trades(pair, args.codec, prune=args.prune)
+        else:
+            entries = archive_ohlcv(pair, Timeframe[args.timeframe], args.codec)
+        raw = sum(entry["raw_bytes"] for entry in entries)
+        compressed = sum(entry["compressed_bytes"] for entry in entries)
+        logging.info(
+            "%s: %d partitions, %d bytes compressed to %d (ratio %.2f)",
+            pair,
+            len(entries),
+            raw,
+            compressed,
+            raw / compressed if compressed else 0,
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
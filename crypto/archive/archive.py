@@ -0,0 +1,336 @@
+import calendar
+import csv
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+
+from utils import get_data_path, consts
+from .codecs import get_codec
+
+ARCHIVE_DIRECTORY = "archive"
+MANIFEST_NAME = "manifest.json"
+TRADES = "trades"
+# column holding the epoch of a row, per kind of data
+TIME_COLUMNS = {TRADES: 2}
+OHLCV_TIME_COLUMN = 0
+
+
+def ohlcv_kind(timeframe):
+    return "ohlcv_" + str(timeframe)
+
+
+def _time_column(kind):
+    return TIME_COLUMNS.get(kind, OHLCV_TIME_COLUMN)
+
+
+def _archive_path(pair, *parts):
+    return get_data_path(os.path.join(ARCHIVE_DIRECTORY, pair, *parts))
+
+
+def _next_month(seconds):
+    """ _next_month returns the name of the month of seconds and the epoch it ends at """
+    t = datetime.utcfromtimestamp(seconds)
+    year, month = (t.year + 1, 1) if t.month == 12 else (t.year, t.month + 1)
+    return t.strftime("%Y-%m"), float(calendar.timegm((year, month, 1, 0, 0, 0)))
+
+
+def _month_start(month):
+    """ _month_start returns the epoch a month named like 2018-01 starts at """
+    year, month = month.split("-")
+    return float(calendar.timegm((int(year), int(month), 1, 0, 0, 0)))
+
+
+def load_manifest(pair):
+    """ load_manifest returns the manifest of pair's archive, empty if there is none """
+    path = _archive_path(pair, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"pair": pair, "partitions": {}}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _write_manifest(pair, manifest):
+    path = _archive_path(pair, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+class _PartitionWriter(object):
+    """ _PartitionWriter compresses one month of rows and collects its manifest entry """
+
+    def __init__(self, pair, kind, month, codec):
+        self.relative_path = os.path.join(kind, month + ".csv" + codec.extension)
+        self.path = _archive_path(pair, self.relative_path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.entry = {
+            "month": month,
+            "path": self.relative_path,
+            "codec": codec.name,
+            "rows": 0,
+            "start": None,
+            "end": None,
+            "raw_bytes": 0,
+        }
+        self._sha256 = hashlib.sha256()
+        self._f = codec.open(self.path + ".tmp", "wt")
+
+    def write(self, line, seconds):
+        if self.entry["start"] is None:
+            self.entry["start"] = seconds
+        self.entry["end"] = seconds
+        self.entry["rows"] += 1
+        encoded = line.encode()
+        self.entry["raw_bytes"] += len(encoded)
+        self._sha256.update(encoded)
+        self._f.write(line)
+
+    def close(self):
+        self._f.close()
+        os.replace(self.path + ".tmp", self.path)
+        self.entry["compressed_bytes"] = os.path.getsize(self.path)
+        self.entry["sha256"] = self._sha256.hexdigest()
+        return self.entry
+
+
+def _row_seconds(line, column):
+    """ _row_seconds returns the epoch of a csv line, None for a header or truncated line """
+    try:
+        return float(line.split(",", column + 1)[column])
+    except (ValueError, IndexError):
+        return None
+
+
+def _prune(source_path, column, keep_from):
+    """ _prune drops the rows of source_path before keep_from, keeping any header """
+    with open(source_path, "r", newline="") as f:
+        with open(source_path + ".tmp", "w", newline="") as out:
+            for line in f:
+                seconds = _row_seconds(line, column)
+                if seconds is None or seconds >= keep_from:
+                    out.write(line)
+    os.replace(source_path + ".tmp", source_path)
+
+
+def _archive(pair, kind, source_path, codec, prune):
+    codec = get_codec(codec)
+    column = _time_column(kind)
+    logging.info(f"Archiving {source_path} as {kind} of {pair} with {codec.name}")
+
+    # months before the newest archived one are closed and archived once,
+    # the newest may have been archived before it ended so it is rewritten
+    manifest = load_manifest(pair)
+    archived = manifest["partitions"].get(kind, [])
+    resume = _month_start(archived[-1]["month"]) if archived else None
+
+    entries = []
+    writer = None
+    month_end = None
+    skipped = 0
+    with open(source_path, "r", newline="") as f:
+        for line in f:
+            seconds = _row_seconds(line, column)
+            if seconds is None:
+                continue
+            if resume is not None and seconds < resume:
+                skipped += 1
+                continue
+            if month_end is None or seconds >= month_end:
+                if writer is not None:
+                    entries.append(writer.close())
+                month, month_end = _next_month(seconds)
+                writer = _PartitionWriter(pair, kind, month, codec)
+            writer.write(line, seconds)
+    if writer is not None:
+        entries.append(writer.close())
+    if skipped:
+        logging.info(f"Skipped {skipped} rows of months archived before")
+
+    # months that are in the source replace their previous partitions
+    months = {entry["month"] for entry in entries}
+    partitions = [entry for entry in archived if entry["month"] not in months]
+    manifest["partitions"][kind] = sorted(
+        partitions + entries, key=lambda entry: entry["month"]
+    )
+    _write_manifest(pair, manifest)
+    logging.info(f"Archived {len(entries)} partitions of {kind} for {pair}")
+
+    if prune and entries:
+        # only the last month can still get rows, the closed ones live in the archive now
+        _prune(source_path, column, _month_start(entries[-1]["month"]))
+    return entries
+
+
+def archive_trades(pair, codec=None, source_path=None, prune=False):
+    """
+    archive_trades splits pair's _trades.csv into one compressed partition per month
+    Only the months from the newest archived one on are written, and with prune the
+    rows of the months that have ended are then removed from the csv, so it only keeps
+    the current month and get_trade_history keeps appending to it
+    Pruned history is read back with open_trades, which resample_trade_data and
+    gaps.scan_trades use, but repair_trades can not backfill gaps in it
+    codec defaults to the best installed one, see get_codec
+    returns the manifest entries of the partitions written
+    """
+    source_path = source_path or get_data_path(pair + consts.TRADES_AFFIX)
+    return _archive(pair, TRADES, source_path, codec, prune)
+
+
+def archive_ohlcv(pair, timeframe, codec=None, source_path=None, prune=False):
+    """ archive_ohlcv splits pair's ohlcv file of timeframe into monthly partitions """
+    source_path = source_path or get_data_path(
+        pair + "_" + str(timeframe) + consts.OHLCV_AFFIX
+    )
+    return _archive(pair, ohlcv_kind(timeframe), source_path, codec, prune)
+
+
+def last_archived_time(pair, kind):
+    """ last_archived_time returns the epoch of the last archived row of kind, None without one """
+    partitions = load_manifest(pair)["partitions"].get(kind, [])
+    return partitions[-1]["end"] if partitions else None
+
+
+def select_partitions(pair, kind, start=None, end=None):
+    """ select_partitions returns the manifest entries holding rows in [start, end) """
+    return [
+        entry
+        for entry in load_manifest(pair)["partitions"].get(kind, [])
+        if (start is None or entry["end"] >= start)
+        and (end is None or entry["start"] < end)
+    ]
+
+
+def first_row_time(path, kind):
+    """ first_row_time returns the epoch of the first row of the csv at path, None without one """
+    column = _time_column(kind)
+    try:
+        f = open(path, "r", newline="")
+    except FileNotFoundError:
+        return None
+    with f:
+        for line in f:
+            seconds = _row_seconds(line, column)
+            if seconds is not None:
+                return seconds
+    return None
+
+
+class ArchiveStream(object):
+    """
+    ArchiveStream is a read only text stream over the rows of kind in [start, end)
+    Only the selected partitions are opened, one at a time, as they are reached
+    With a source_path the archived rows before the first row of that csv are
+    followed by the csv's own rows, so history pruned out of it is read back in
+    """
+
+    def __init__(self, pair, kind, start=None, end=None, source_path=None):
+        self.pair = pair
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self._column = _time_column(kind)
+        self._source_path = source_path
+        # the bound the archived rows are read up to
+        self._end = end
+        if source_path is not None:
+            first = first_row_time(source_path, kind)
+            if first is not None and (end is None or first < end):
+                self._end = first
+        self._partitions = iter(select_partitions(pair, kind, start, self._end))
+        self._f = None
+        self._filter = False
+
+    def _next_partition(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        entry = next(self._partitions, None)
+        if entry is None:
+            return self._open_source()
+        self._f = get_codec(entry["codec"]).open(
+            _archive_path(self.pair, entry["path"]), "rt"
+        )
+        # only partitions straddling a bound need their rows checked
+        self._filter = (self.start is not None and entry["start"] < self.start) or (
+            self._end is not None and entry["end"] >= self._end
+        )
+        return True
+
+    def _open_source(self):
+        if self._source_path is None or not os.path.exists(self._source_path):
+            return False
+        self._f = open(self._source_path, "r", newline="")
+        self._source_path = None
+        self._end = self.end
+        # the csv may have a header row
+        self._filter = True
+        return True
+
+    def readline(self):
+        while True:
+            if self._f is None and not self._next_partition():
+                return ""
+            line = self._f.readline()
+            if not line:
+                self._next_partition()
+                continue
+            if self._filter:
+                seconds = _row_seconds(line, self._column)
+                if seconds is None:
+                    continue
+                if self.start is not None and seconds < self.start:
+                    continue
+                if self._end is not None and seconds >= self._end:
+                    # the rest is past the bound, go on to the source if any
+                    self._partitions = iter(())
+                    self._next_partition()
+                    continue
+            return line
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        self._partitions = iter(())
+        self._source_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_range(pair, kind, start=None, end=None):
+    """
+    open_range returns a text stream over the archived rows of kind in [start, end)
+    in the same format as the csv file they were archived from
+    """
+    return ArchiveStream(pair, kind, start, end)
+
+
+def open_trades(pair, start=None, end=None, source_path=None):
+    """
+    open_trades returns a text stream over all of pair's trades in [start, end),
+    the archived ones before the first row of its _trades.csv then the csv's rows,
+    so readers see the whole history whether or not archive_trades pruned the csv
+    """
+    source_path = source_path or get_data_path(pair + consts.TRADES_AFFIX)
+    return ArchiveStream(pair, TRADES, start, end, source_path)
+
+
+def iter_rows(pair, kind, start=None, end=None):
+    """ iter_rows yields the archived rows of kind in [start, end) as csv rows """
+    with open_range(pair, kind, start, end) as stream:
+        yield from csv.reader(stream)
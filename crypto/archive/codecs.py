@@ -0,0 +1,73 @@
+import gzip
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+ZSTD_LEVEL = 10
+LZ4_LEVEL = 9
+ZLIB_LEVEL = 6
+
+
+class Codec(object):
+    """ Codec opens compressed partition files as text streams """
+
+    def __init__(self, name, extension, opener):
+        self.name = name
+        self.extension = extension
+        self._opener = opener
+
+    def open(self, path, mode="rt"):
+        return self._opener(path, mode)
+
+    def __repr__(self):
+        return "Codec(%s)" % self.name
+
+
+def _zstd_open(path, mode):
+    if "w" in mode:
+        cctx = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        return zstandard.open(path, mode, cctx=cctx, newline="")
+    return zstandard.open(path, mode, newline="")
+
+
+def _lz4_open(path, mode):
+    return lz4.frame.open(path, mode, compression_level=LZ4_LEVEL, newline="")
+
+
+def _zlib_open(path, mode):
+    return gzip.open(path, mode, compresslevel=ZLIB_LEVEL, newline="")
+
+
+_CODECS = {
+    "zstd": (zstandard, lambda: Codec("zstd", ".zst", _zstd_open)),
+    "lz4": (lz4, lambda: Codec("lz4", ".lz4", _lz4_open)),
+    "zlib": (gzip, lambda: Codec("zlib", ".gz", _zlib_open)),
+}
+# codecs in order of preference, zlib is always available
+PREFERENCE = ["zstd", "lz4", "zlib"]
+
+
+def available_codecs():
+    return [name for name in PREFERENCE if _CODECS[name][0] is not None]
+
+
+def get_codec(name=None):
+    """
+    get_codec returns the named codec, or the preferred installed one
+    zstd if zstandard is installed, lz4 if lz4 is installed, zlib otherwise
+    """
+    if name is None:
+        name = available_codecs()[0]
+    if name not in _CODECS:
+        raise ValueError(f"Unknown codec {name}, expected one of {PREFERENCE}")
+    module, factory = _CODECS[name]
+    if module is None:
+        raise RuntimeError(f"Codec {name} needs a package that is not installed")
+    return factory()
@@ -0,0 +1,106 @@
+import calendar
+
+import pytest
+
+import archive
+from utils import get_data_path, consts
+
+PAIR = "XXBTZUSD"
+JAN_15 = calendar.timegm((2018, 1, 15, 0, 0, 0))
+FEB_1 = calendar.timegm((2018, 2, 1, 0, 0, 0))
+MAR_1 = calendar.timegm((2018, 3, 1, 0, 0, 0))
+APR_1 = calendar.timegm((2018, 4, 1, 0, 0, 0))
+APR_10 = calendar.timegm((2018, 4, 10, 0, 0, 0))
+MAY_20 = calendar.timegm((2018, 5, 20, 0, 0, 0))
+
+
+@pytest.fixture
+def trades_csv(tmp_path, monkeypatch):
+    monkeypatch.setenv("CRYPTO_DATA_DIR", str(tmp_path))
+    path = get_data_path(PAIR + consts.TRADES_AFFIX)
+    write_trades(path, JAN_15, APR_10)
+    return path
+
+
+def write_trades(path, start, end, mode="w"):
+    with open(path, mode) as f:
+        for i, seconds in enumerate(range(start, end, 1800)):
+            f.write(
+                "%.5f,0.01000000,%.4f,b,l,\r\n" % (10000 + i % 97, seconds + 0.1234)
+            )
+
+
+@pytest.mark.parametrize("codec", archive.available_codecs())
+def test_archive_round_trip(trades_csv, codec):
+    with open(trades_csv, "r", newline="") as f:
+        lines = f.readlines()
+    entries = archive.archive_trades(PAIR, codec)
+
+    assert [entry["month"] for entry in entries] == [
+        "2018-01",
+        "2018-02",
+        "2018-03",
+        "2018-04",
+    ]
+    assert all(entry["codec"] == codec for entry in entries)
+    assert all(entry["compressed_bytes"] < entry["raw_bytes"] for entry in entries)
+    assert list(archive.open_range(PAIR, archive.TRADES)) == lines
+
+
+def test_range_query_reads_only_needed_partitions(trades_csv):
+    archive.archive_trades(PAIR)
+    selected = archive.select_partitions(PAIR, archive.TRADES, FEB_1 + 3600, MAR_1)
+    assert [entry["month"] for entry in selected] == ["2018-02"]
+
+    rows = list(archive.iter_rows(PAIR, archive.TRADES, FEB_1 + 3600, MAR_1))
+    times = [float(row[2]) for row in rows]
+    assert min(times) >= FEB_1 + 3600
+    assert max(times) < MAR_1
+    assert len(rows) == (MAR_1 - FEB_1 - 3600) // 1800
+
+
+def test_rearchiving_replaces_months(trades_csv):
+    archive.archive_trades(PAIR, "zlib")
+    archive.archive_trades(PAIR, "zlib")
+    manifest = archive.load_manifest(PAIR)
+    assert len(manifest["partitions"][archive.TRADES]) == 4
+
+
+def test_archiving_prunes_closed_months(trades_csv):
+    archive.archive_trades(PAIR, prune=True)
+    with open(trades_csv, "r", newline="") as f:
+        times = [float(line.split(",")[2]) for line in f]
+    assert min(times) >= APR_1
+    assert len(times) == (APR_10 - APR_1) // 1800
+
+
+def test_rearchiving_only_writes_new_months(trades_csv):
+    with open(trades_csv, "r", newline="") as f:
+        lines = f.readlines()
+    archive.archive_trades(PAIR, prune=True)
+    write_trades(trades_csv, APR_10, MAY_20, mode="a")
+    with open(trades_csv, "r", newline="") as f:
+        lines += f.readlines()[(APR_10 - APR_1) // 1800 :]
+
+    entries = archive.archive_trades(PAIR, prune=True)
+    assert [entry["month"] for entry in entries] == ["2018-04", "2018-05"]
+    assert list(archive.open_range(PAIR, archive.TRADES)) == lines
+    assert archive.last_archived_time(PAIR, archive.TRADES) == float(
+        lines[-1].split(",")[2]
+    )
+
+
+def test_open_trades_joins_the_archive_and_the_pruned_csv(trades_csv):
+    with open(trades_csv, "r", newline="") as f:
+        lines = f.readlines()
+    archive.archive_trades(PAIR, prune=True)
+    # traded after archiving, only in the csv
+    write_trades(trades_csv, APR_10, APR_10 + 1800, mode="a")
+    with open(trades_csv, "r", newline="") as f:
+        lines.append(f.readlines()[-1])
+
+    assert list(archive.open_trades(PAIR)) == lines
+    rows = list(archive.open_trades(PAIR, MAR_1 - 3600, APR_1 + 3600))
+    assert [float(row.split(",")[2]) for row in rows] == [
+        seconds + 0.1234 for seconds in range(MAR_1 - 3600, APR_1 + 3600, 1800)
+    ]
@@ -0,0 +1,46 @@
+import backtrader as bt
+
+# backtrader's date2num of 1970-01-01
+EPOCH_DATENUM = 719163.0
+SECONDS_PER_DAY = 86400.0
+
+
+class ArrayData(bt.feed.DataBase):
+    """
+    Datafeed for backtrader over an array of prepared candles (see prepared.CANDLE_DTYPE)
+    The array is only read, so slices and memory mapped arrays can be passed as they are
+    The synthetic line is 1 on the candles resample_trade_data filled in without trades
+    """
+
+    lines = ("synthetic",)
+    params = (("candles", None),)
+
+    def start(self):
+        super(ArrayData, self).start()
+        candles = self.p.candles
+        self._rows = zip(
+            (candles["datetime"] / SECONDS_PER_DAY + EPOCH_DATENUM).tolist(),
+            candles["open"].tolist(),
+            candles["high"].tolist(),
+            candles["low"].tolist(),
+            candles["close"].tolist(),
+            candles["volume"].tolist(),
+            candles["synthetic"].tolist(),
+        )
+
+    def _load(self):
+        row = next(self._rows, None)
+        if row is None:
+            return False
+        lines = self.lines
+        (
+            lines.datetime[0],
+            lines.open[0],
+            lines.high[0],
+            lines.low[0],
+            lines.close[0],
+            lines.volume[0],
+            lines.synthetic[0],
+        ) = row
+        lines.openinterest[0] = 0.0
+        return True
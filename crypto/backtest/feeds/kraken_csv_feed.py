@@ -1,5 +1,7 @@
 from backtrader.feeds import GenericCSVData
 
+import archive
+
 
 class KrakenCSVData(GenericCSVData):
     """Kraken csv datafeed for backtrader"""
@@ -8,3 +10,17 @@ class KrakenCSVData(GenericCSVData):
         ("dtformat", 2),
         ("openinterest", -1),
     )
+
+    @classmethod
+    def from_archive(cls, pair, ohlcv_timeframe, start=None, end=None, **kwargs):
+        """
+        from_archive feeds the archived ohlcv candles of pair in [start, end)
+        decompressing only the monthly partitions in that range
+        ohlcv_timeframe is the utils.Timeframe the candles were resampled to
+        """
+        kind = archive.ohlcv_kind(ohlcv_timeframe)
+        stream = archive.open_range(pair, kind, start, end)
+        # archived partitions hold no header row
+        kwargs.setdefault("headers", False)
+        kwargs.setdefault("name", pair + "_" + str(ohlcv_timeframe))
+        return cls(dataname=stream, **kwargs)
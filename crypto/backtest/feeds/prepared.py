@@ -0,0 +1,128 @@
+"""
+Candles prepared for a backtest: parsed, filtered to a date range and resampled
+once, then cached on disk keyed by the source file and the preparation options
+"""
+
+import calendar
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+from utils import get_data_path
+
+# synthetic is 1 for the candles resample_trade_data filled in without trades
+CANDLE_COLUMNS = ["datetime", "open", "high", "low", "close", "volume", "synthetic"]
+CANDLE_DTYPE = np.dtype([(column, "<f8") for column in CANDLE_COLUMNS])
+CACHE_DIRECTORY = "cache"
+# bump when the layout or the preparation of cached candles changes
+CACHE_VERSION = 2
+
+
+def to_epoch(dt):
+    """ to_epoch turns a naive UTC datetime into unix seconds, None stays None """
+    return None if dt is None else float(calendar.timegm(dt.utctimetuple()))
+
+
+def load_candles(path):
+    """
+    load_candles parses an ohlcv csv as written by resample_trade_data,
+    the candles of files without a synthetic column are all real
+    """
+    data = np.loadtxt(path, delimiter=",", ndmin=2)
+    candles = np.zeros(len(data), dtype=CANDLE_DTYPE)
+    for i, column in enumerate(CANDLE_COLUMNS[: data.shape[1]]):
+        candles[column] = data[:, i]
+    return candles
+
+
+def resample_candles(candles, seconds):
+    """
+    resample_candles merges candles into candles of `seconds`
+    candles are labelled by the end of their interval, so a candle labelled t
+    goes into the candle labelled by the first multiple of seconds >= t
+    and a merged candle is only synthetic if all of its candles are
+    """
+    if not len(candles):
+        return candles
+    labels = np.ceil(candles["datetime"] / seconds) * seconds
+    starts = np.flatnonzero(np.append(True, labels[1:] != labels[:-1]))
+    ends = np.append(starts[1:], len(candles)) - 1
+
+    resampled = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    resampled["datetime"] = labels[starts]
+    resampled["open"] = candles["open"][starts]
+    resampled["high"] = np.maximum.reduceat(candles["high"], starts)
+    resampled["low"] = np.minimum.reduceat(candles["low"], starts)
+    resampled["close"] = candles["close"][ends]
+    resampled["volume"] = np.add.reduceat(candles["volume"], starts)
+    resampled["synthetic"] = np.minimum.reduceat(candles["synthetic"], starts)
+    return resampled
+
+
+def _digest(*parts):
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def cache_key(path, seconds, start, end):
+    """
+    cache_key names the cached candles of path prepared with the given options
+    as options-source, so entries of older versions of the source share a prefix
+    and the source part changes whenever the file does
+    """
+    stat = os.stat(path)
+    options = _digest(os.path.abspath(path), seconds, start, end)
+    return options + "-" + _digest(CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+
+
+def _evict_stale(cache_path):
+    """ _evict_stale removes the entries cached for the same options as cache_path """
+    directory, name = os.path.split(cache_path)
+    prefix = name.split("-", 1)[0] + "-"
+    for other in os.listdir(directory):
+        if other.startswith(prefix) and other.endswith(".npy") and other != name:
+            logging.info(f"Removing stale prepared candles {other}")
+            try:
+                os.remove(os.path.join(directory, other))
+            except FileNotFoundError:
+                # removed by a concurrent run
+                pass
+
+
+def prepare_candles(path, seconds=None, start=None, end=None, use_cache=True):
+    """
+    prepare_candles returns the candles of the csv at path with start <= datetime < end,
+    resampled to `seconds` if given
+    The result is cached as a .npy file in the data folder's cache directory
+    and memory mapped on later calls with the same arguments, replacing the entry
+    cached for an older version of the file
+    """
+    cache_path = None
+    if use_cache:
+        cache_path = get_data_path(
+            os.path.join(CACHE_DIRECTORY, cache_key(path, seconds, start, end) + ".npy")
+        )
+        if os.path.exists(cache_path):
+            logging.info(f"Loading prepared candles from {cache_path}")
+            return np.load(cache_path, mmap_mode="r")
+
+    logging.info(f"Preparing candles from {path}")
+    candles = load_candles(path)
+    mask = np.ones(len(candles), dtype=bool)
+    if start is not None:
+        mask &= candles["datetime"] >= start
+    if end is not None:
+        mask &= candles["datetime"] < end
+    candles = candles[mask]
+    if seconds:
+        candles = resample_candles(candles, seconds)
+
+    if cache_path is not None:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # write then rename so concurrent runs never read a partial file
+        with open(cache_path + ".tmp", "wb") as f:
+            np.save(f, candles)
+        os.replace(cache_path + ".tmp", cache_path)
+        _evict_stale(cache_path)
+    return candles
@@ -0,0 +1,205 @@
+"""
+Vectorized backtests of many pairs sharing one cash balance
+The candles of every pair are aligned once on a shared time index and held as
+(time, pair) matrices, so signals are computed for all pairs in one pass and the
+simulation only steps through the bars where the target portfolio changes
+"""
+
+import logging
+from collections import namedtuple
+
+import numpy as np
+
+from utils import consts, get_data_path
+from .feeds.prepared import prepare_candles
+
+PRICE_FIELDS = ["open", "high", "low", "close"]
+
+PortfolioResult = namedtuple(
+    "PortfolioResult", ["index", "equity", "cash", "holdings", "trades", "fees"]
+)
+
+
+class CandleMatrix(object):
+    """
+    CandleMatrix holds one (time, pair) matrix per candle field over a shared index
+    A pair without a candle at an index inherits its last close with no volume,
+    before its first candle its prices are NaN
+    synthetic is True where a pair has no candle or resample_trade_data filled it in
+    """
+
+    __slots__ = [
+        "pairs",
+        "index",
+        "open",
+        "high",
+        "low",
+        "close",
+        "volume",
+        "synthetic",
+    ]
+
+    def __init__(self, pairs, index, open, high, low, close, volume, synthetic):
+        self.pairs = pairs
+        self.index = index
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.synthetic = synthetic
+
+    @classmethod
+    def from_candles(cls, candles_by_pair):
+        """ from_candles aligns a {pair: prepared candles} dict on the union of their times """
+        pairs = list(candles_by_pair)
+        columns = [candles_by_pair[pair] for pair in pairs]
+        index = np.unique(np.concatenate([c["datetime"] for c in columns]))
+        shape = (len(index), len(pairs))
+
+        fields = {field: np.full(shape, np.nan) for field in PRICE_FIELDS}
+        fields["volume"] = np.zeros(shape)
+        present = np.zeros(shape, dtype=bool)
+        synthetic = np.ones(shape, dtype=bool)
+        for j, candles in enumerate(columns):
+            rows = np.searchsorted(index, candles["datetime"])
+            present[rows, j] = True
+            synthetic[rows, j] = candles["synthetic"] != 0
+            for field in fields:
+                fields[field][rows, j] = candles[field]
+
+        # forward fill missing candles with the previous close, for all pairs at once
+        last = np.where(present, np.arange(len(index))[:, None], 0)
+        np.maximum.accumulate(last, axis=0, out=last)
+        listed = np.maximum.accumulate(present, axis=0)
+        missing = listed & ~present
+        filled = fields["close"][last, np.arange(len(pairs))]
+        for field in PRICE_FIELDS:
+            fields[field][missing] = filled[missing]
+        return cls(pairs, index, synthetic=synthetic, **fields)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __repr__(self):
+        return "CandleMatrix(pairs=%d, bars=%d)" % (len(self.pairs), len(self.index))
+
+
+def load_matrix(
+    pairs, source_timeframe="M1", seconds=None, start=None, end=None, use_cache=True
+):
+    """
+    load_matrix prepares the ohlcv candles of each pair (see prepare_candles)
+    and aligns them in a CandleMatrix, pairs without an ohlcv file are skipped
+    """
+    candles_by_pair = {}
+    for pair in pairs:
+        path = get_data_path(pair + "_" + str(source_timeframe) + consts.OHLCV_AFFIX)
+        try:
+            candles = prepare_candles(path, seconds, start, end, use_cache)
+        except FileNotFoundError:
+            logging.warning(f"No {source_timeframe} candles for {pair}, skipping it")
+            continue
+        if len(candles):
+            candles_by_pair[pair] = candles
+    if not candles_by_pair:
+        raise ValueError("none of the pairs have candles")
+    return CandleMatrix.from_candles(candles_by_pair)
+
+
+def rolling_mean(values, period):
+    """
+    rolling_mean averages the last `period` rows of every column,
+    NaN until a column has `period` valid rows in its window
+    """
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[period:] -= sums[:-period].copy()
+    counts[period:] -= counts[:-period].copy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts == period, sums / period, np.nan)
+
+
+def sma_crossover(matrix, fast=15, slow=60):
+    """ sma_crossover is long every pair whose fast close average is above its slow one """
+    return rolling_mean(matrix.close, fast) > rolling_mean(matrix.close, slow)
+
+
+def momentum_rank(matrix, lookback=60, top=3):
+    """
+    momentum_rank is long the `top` pairs with the best positive return over `lookback` bars,
+    a cross-asset signal: each pair's position depends on every other pair
+    """
+    close = matrix.close
+    returns = np.full(close.shape, -np.inf)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns[lookback:] = close[lookback:] / close[:-lookback] - 1
+    returns[np.isnan(returns)] = -np.inf
+    ranks = np.argsort(np.argsort(-returns, axis=1, kind="stable"), axis=1)
+    return (ranks < top) & np.isfinite(returns) & (returns > 0)
+
+
+def equal_weights(signals, max_weight=None):
+    """ equal_weights splits the portfolio evenly between the pairs signalled long """
+    counts = signals.sum(axis=1, keepdims=True)
+    weights = signals / np.maximum(counts, 1)
+    if max_weight is not None:
+        np.minimum(weights, max_weight, out=weights)
+    return weights
+
+
+def simulate(matrix, weights, cash=100000.0, commission=0.001):
+    """
+    simulate trades the pairs whose target weight changes on a bar at the next bar's open
+    and marks the portfolio to the close of every bar, all pairs sharing one cash balance
+    A pair whose weight did not change keeps its units, however its price moved,
+    and buys are scaled down to the cash left when the other pairs have grown
+    The fees of a rebalance are paid out of the value it allocates to its targets
+    """
+    opens = np.nan_to_num(matrix.open)
+    closes = np.nan_to_num(matrix.close)
+    n = len(matrix)
+    holdings = np.zeros(len(matrix.pairs))
+    # the weights the holdings were last traded to
+    applied = np.zeros(len(matrix.pairs))
+    equity = np.empty(n)
+    trades = 0
+    fees = 0.0
+
+    # the portfolio only changes the bar after its targets change
+    changed = np.any(weights[1:] != weights[:-1], axis=1)
+    rebalances = np.flatnonzero(np.concatenate((weights[:1].any(axis=1), changed))) + 1
+    rebalances = rebalances[rebalances < n]
+
+    segment_start = 0
+    for row in rebalances.tolist():
+        equity[segment_start:row] = cash + closes[segment_start:row] @ holdings
+        prices = opens[row]
+        value = cash + prices @ holdings
+        # pairs without a price yet are traded once they have one
+        moved = (weights[row - 1] != applied) & (prices > 0)
+        target = holdings.copy()
+        target[moved] = weights[row - 1, moved] * value / prices[moved]
+        if value > 0:
+            # leave room for the fees of trading to the unscaled targets
+            turnover = np.abs(target - holdings) @ prices
+            target[moved] *= 1 - turnover * commission / value
+
+        buys = target > holdings
+        sold = (holdings - target)[~buys] @ prices[~buys] * (1 - commission)
+        bought = (target - holdings)[buys] @ prices[buys] * (1 + commission)
+        if bought > cash + sold:
+            # the pairs left alone are worth more than their weights
+            scale = max(cash + sold, 0.0) / bought
+            target[buys] = holdings[buys] + (target - holdings)[buys] * scale
+
+        fee = (np.abs(target - holdings) @ prices) * commission
+        cash += (holdings - target) @ prices - fee
+        trades += int(np.count_nonzero(target != holdings))
+        fees += fee
+        holdings = target
+        applied[moved] = weights[row - 1, moved]
+        segment_start = row
+    equity[segment_start:] = cash + closes[segment_start:] @ holdings
+    return PortfolioResult(matrix.index, equity, cash, holdings, trades, fees)
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from backtest import portfolio
+from backtest.feeds.prepared import CANDLE_DTYPE
+
+
+def make_candles(times, closes):
+    candles = np.zeros(len(times), dtype=CANDLE_DTYPE)
+    candles["datetime"] = times
+    for field in portfolio.PRICE_FIELDS:
+        candles[field] = closes
+    candles["volume"] = 1.0
+    return candles
+
+
+@pytest.fixture
+def matrix():
+    return portfolio.CandleMatrix.from_candles(
+        {
+            "A": make_candles([60, 120, 180, 240], [10, 11, 12, 13]),
+            # listed later and missing the 240 candle
+            "B": make_candles([120, 180, 300], [100, 50, 25]),
+        }
+    )
+
+
+def test_candles_are_aligned_and_forward_filled(matrix):
+    assert matrix.index.tolist() == [60, 120, 180, 240, 300]
+    np.testing.assert_array_equal(matrix.close[:, 0], [10, 11, 12, 13, 13])
+    np.testing.assert_array_equal(matrix.close[:, 1], [np.nan, 100, 50, 50, 25])
+    np.testing.assert_array_equal(matrix.volume[:, 1], [0, 1, 1, 0, 1])
+    np.testing.assert_array_equal(matrix.synthetic[:, 1], [1, 0, 0, 1, 0])
+
+
+def test_rolling_mean_waits_for_a_full_window(matrix):
+    means = portfolio.rolling_mean(matrix.close, 2)
+    np.testing.assert_array_equal(means[:, 0], [np.nan, 10.5, 11.5, 12.5, 13])
+    np.testing.assert_array_equal(means[:, 1], [np.nan, np.nan, 75, 50, 37.5])
+
+
+def test_simulate_trades_at_the_next_open_from_shared_cash(matrix):
+    weights = np.zeros(matrix.close.shape)
+    weights[1:3] = [0.5, 0.5]
+    result = portfolio.simulate(matrix, weights, cash=1000, commission=0)
+
+    # bought at the 180 open, sold at the 300 open
+    assert result.trades == 4
+    np.testing.assert_allclose(result.holdings, [0, 0])
+    np.testing.assert_allclose(
+        result.equity, [1000, 1000, 1000, 500 / 12 * 13 + 500, 500 / 12 * 13 + 250]
+    )
+    assert result.cash == pytest.approx(result.equity[-1])
+
+
+def test_fees_come_out_of_the_targets(matrix):
+    weights = np.zeros(matrix.close.shape)
+    weights[1:, 0] = 1
+    result = portfolio.simulate(matrix, weights, cash=1000, commission=0.01)
+    assert result.fees == pytest.approx(9.9)
+    assert result.cash == pytest.approx(0.1)
+
+
+def test_simulate_only_trades_the_pairs_whose_weight_changed():
+    matrix = portfolio.CandleMatrix.from_candles(
+        {
+            "A": make_candles([60, 120, 180, 240], [10, 10, 20, 20]),
+            "B": make_candles([60, 120, 180, 240], [10, 10, 10, 10]),
+        }
+    )
+    weights = np.zeros(matrix.close.shape)
+    weights[:, 0] = 0.1
+    weights[2:, 1] = 0.1
+    result = portfolio.simulate(matrix, weights, cash=1000, commission=0)
+
+    # A keeps the 10 units it bought at 10 although it doubled before B was bought
+    assert result.trades == 2
+    np.testing.assert_allclose(result.holdings, [10, 11])
+
+
+def test_simulate_scales_buys_to_the_cash_left():
+    matrix = portfolio.CandleMatrix.from_candles(
+        {
+            "A": make_candles([60, 120, 180, 240], [10, 10, 30, 30]),
+            "B": make_candles([60, 120, 180, 240], [10, 10, 10, 10]),
+        }
+    )
+    weights = np.zeros(matrix.close.shape)
+    weights[:, 0] = 0.5
+    weights[2:, 1] = 0.5
+    result = portfolio.simulate(matrix, weights, cash=1000, commission=0)
+
+    assert result.cash == pytest.approx(0)
+    np.testing.assert_allclose(result.holdings, [50, 50])
+
+
+def test_momentum_rank_picks_the_best_performers():
+    closes = [[1, 1, 1], [2, 1.5, 0.5], [4, 1.5, 1]]
+    matrix = portfolio.CandleMatrix.from_candles(
+        {
+            pair: make_candles([60, 120, 180], [row[j] for row in closes])
+            for j, pair in enumerate("ABC")
+        }
+    )
+    signals = portfolio.momentum_rank(matrix, lookback=1, top=2)
+    assert signals.tolist() == [
+        [False, False, False],
+        [True, True, False],
+        [True, False, True],
+    ]
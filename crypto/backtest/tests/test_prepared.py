@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+import pytest
+
+from backtest.feeds.prepared import CANDLE_DTYPE, prepare_candles, resample_candles
+
+# M1 candles labelled by the end of their minute
+CANDLES = [
+    (60.0, 10.0, 12.0, 9.0, 11.0, 1.0, 0.0),
+    (120.0, 11.0, 15.0, 10.0, 14.0, 2.0, 1.0),
+    (180.0, 14.0, 14.5, 8.0, 9.0, 3.0, 0.0),
+    (240.0, 9.0, 9.5, 8.5, 9.2, 0.0, 1.0),
+]
+
+
+@pytest.fixture
+def ohlcv_csv(tmp_path, monkeypatch):
+    monkeypatch.setenv("CRYPTO_DATA_DIR", str(tmp_path))
+    path = str(tmp_path / "XXBTZUSD_M1_ohlcv.csv")
+    with open(path, "w") as f:
+        for candle in CANDLES:
+            f.write(",".join(str(value) for value in candle) + "\n")
+    return path
+
+
+def test_resample_candles():
+    resampled = resample_candles(np.array(CANDLES, dtype=CANDLE_DTYPE), 180)
+    assert resampled.tolist() == [
+        (180.0, 10.0, 15.0, 8.0, 9.0, 6.0, 0.0),
+        (360.0, 9.0, 9.5, 8.5, 9.2, 0.0, 1.0),
+    ]
+
+
+def test_candles_without_a_synthetic_column_are_real(ohlcv_csv):
+    with open(ohlcv_csv, "w") as f:
+        for candle in CANDLES:
+            f.write(",".join(str(value) for value in candle[:6]) + "\n")
+    candles = prepare_candles(ohlcv_csv, use_cache=False)
+    assert candles["volume"].tolist() == [1.0, 2.0, 3.0, 0.0]
+    assert candles["synthetic"].tolist() == [0.0] * 4
+
+
+def test_prepare_candles_filters_range(ohlcv_csv):
+    candles = prepare_candles(ohlcv_csv, start=120, end=240, use_cache=False)
+    assert candles["datetime"].tolist() == [120.0, 180.0]
+    assert candles["synthetic"].tolist() == [1.0, 0.0]
+
+
+def test_prepare_candles_cache_follows_source(ohlcv_csv, tmp_path):
+    first = prepare_candles(ohlcv_csv, seconds=180)
+    assert len(os.listdir(str(tmp_path / "cache"))) == 1
+    np.testing.assert_array_equal(prepare_candles(ohlcv_csv, seconds=180), first)
+
+    with open(ohlcv_csv, "a") as f:
+        f.write("300.0,9.2,20.0,9.0,19.0,5.0,0\n")
+    os.utime(ohlcv_csv, ns=(0, os.stat(ohlcv_csv).st_mtime_ns + 10 ** 9))
+    assert prepare_candles(ohlcv_csv, seconds=180)[-1]["high"] == 20.0
+    # the entry of the previous version of the file is evicted
+    assert len(os.listdir(str(tmp_path / "cache"))) == 1
+
+    prepare_candles(ohlcv_csv, seconds=60)
+    assert len(os.listdir(str(tmp_path / "cache"))) == 2
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from backtest import walkforward
+from backtest.feeds.prepared import CANDLE_DTYPE
+from backtest.strategies.test_strategy import TestStrategy
+
+DAY = 86400
+HOUR = 3600
+
+
+def make_candles(days):
+    rng = np.random.default_rng(1)
+    n = days * 24
+    candles = np.zeros(n, dtype=CANDLE_DTYPE)
+    candles["datetime"] = 10 * DAY + HOUR * np.arange(1, n + 1)
+    closes = 10000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    candles["open"] = np.concatenate(([10000], closes[:-1]))
+    candles["high"] = np.maximum(candles["open"], closes) * 1.001
+    candles["low"] = np.minimum(candles["open"], closes) * 0.999
+    candles["close"] = closes
+    candles["volume"] = 1.0
+    return candles
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("CRYPTO_DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_windows_are_stable_when_history_grows():
+    candles = make_candles(30)
+    windows = walkforward.walk_forward_windows(
+        candles["datetime"], train=7 * DAY, test=2 * DAY, step=2 * DAY
+    )
+    assert len(windows) == 10
+    first = windows[0]
+    # windows start on multiples of the step
+    assert candles["datetime"][first.start] == 12 * DAY
+    assert (first.split - first.start, first.end - first.split) == (7 * 24, 2 * 24)
+
+    longer = walkforward.walk_forward_windows(
+        make_candles(40)["datetime"], train=7 * DAY, test=2 * DAY, step=2 * DAY
+    )
+    assert longer[: len(windows)] == windows
+    assert len(longer) == 15
+
+
+def test_walk_forward_memoizes_windows(data_dir):
+    grid = [{"maperiod": period, "printlog": False} for period in (5, 20)]
+    candles = make_candles(20)
+    windows = walkforward.walk_forward_windows(
+        candles["datetime"], train=5 * DAY, test=2 * DAY, step=2 * DAY
+    )
+    runner = walkforward.WindowRunner(candles, compression=60, processes=0)
+    results = walkforward.walk_forward(runner, TestStrategy, grid, windows, warmup=20)
+    assert runner.misses == 3 * len(windows)
+    assert all(result.params in grid for result in results)
+
+    # a longer history recomputes only the windows it adds
+    longer = make_candles(24)
+    runner = walkforward.WindowRunner(longer, compression=60, processes=2)
+    extended = walkforward.walk_forward(
+        runner,
+        TestStrategy,
+        grid,
+        walkforward.walk_forward_windows(
+            longer["datetime"], train=5 * DAY, test=2 * DAY, step=2 * DAY
+        ),
+        warmup=20,
+    )
+    assert runner.hits == 3 * len(windows)
+    assert runner.misses == 3 * (len(extended) - len(windows))
+    assert extended[: len(results)] == results
+
+
+def test_windows_are_valued_after_their_warmup():
+    candles = make_candles(10)
+    params = {"maperiod": 20, "printlog": False}
+    warmed = walkforward.run_backtest(
+        candles[:200], TestStrategy, params, compression=60, warmup=100
+    )
+    # the warm-up rows run exactly as a backtest stopping where they end
+    before = walkforward.run_backtest(
+        candles[:100], TestStrategy, params, compression=60
+    )
+    assert warmed["start_value"] == before["end_value"]
+    assert warmed["start_value"] != 100000.0
+
+
+class FixedRunner(object):
+    """ FixedRunner returns preset results by the maperiod of each job """
+
+    def __init__(self, results):
+        self.results = results
+
+    def run(self, jobs):
+        return [self.results[params["maperiod"]] for _, params, _, _, _ in jobs]
+
+
+def test_params_are_ranked_by_their_return_after_the_warmup():
+    # maperiod 5 lost during the warm-up but made more on the train rows
+    runner = FixedRunner(
+        {
+            5: {"start_value": 90000.0, "end_value": 99000.0},
+            30: {"start_value": 100000.0, "end_value": 100500.0},
+        }
+    )
+    grid = [{"maperiod": 5}, {"maperiod": 30}]
+    windows = [walkforward.Window(40, 100, 150)]
+    (result,) = walkforward.walk_forward(runner, TestStrategy, grid, windows, 30)
+    assert result.params == {"maperiod": 5}
+    assert result.train_value == pytest.approx(1.1)
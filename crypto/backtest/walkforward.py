@@ -0,0 +1,302 @@
+"""
+Walk-forward and rolling-window backtests over one preloaded candle array
+Windows are row ranges of the array, sliced without copying, run in parallel
+and memoized on disk by strategy, params, settings and a hash of the window's
+candles, so extending the history only runs the windows it adds
+Each window is run with warm-up rows before it so its indicators start out
+with history, and only valued from its first row
+"""
+
+import contextlib
+import hashlib
+import inspect
+import io
+import json
+import logging
+import math
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import backtrader as bt
+import numpy as np
+
+from utils import get_data_path
+from .feeds.array_feed import ArrayData
+from .feeds.prepared import CACHE_DIRECTORY
+
+RESULTS_DIRECTORY = os.path.join(CACHE_DIRECTORY, "walkforward")
+# bump when run_backtest changes what it computes
+RESULTS_VERSION = 2
+
+# rows [start, split) are trained on and rows [split, end) tested
+Window = namedtuple("Window", ["start", "split", "end"])
+# train_value is the end to start value ratio of the chosen params on the train rows
+WindowResult = namedtuple(
+    "WindowResult", ["window", "params", "train_value", "start_value", "end_value"]
+)
+
+
+def walk_forward_windows(times, train, test, step=None):
+    """
+    walk_forward_windows splits candle times into windows of train then test seconds,
+    one every step seconds (test by default)
+    Windows start on multiples of step since the epoch and only complete windows
+    are returned, so extending the history keeps the earlier windows as they were
+    With train=0 they are plain rolling windows
+    """
+    step = step or test
+    if not len(times):
+        return []
+    first = math.ceil(times[0] / step) * step
+    count = int((times[-1] - first - train - test) // step) + 1
+    if count <= 0:
+        return []
+    starts = first + step * np.arange(count)
+    rows = np.searchsorted(times, [starts, starts + train, starts + train + test])
+    return [Window(*bounds) for bounds in rows.T.tolist()]
+
+
+class _StartValue(bt.Analyzer):
+    """ _StartValue records the broker value at the close of the last warm-up bar """
+
+    params = (("warmup", 0),)
+
+    def start(self):
+        self.value = self.strategy.broker.getvalue()
+
+    def next(self):
+        if len(self.strategy) == self.p.warmup:
+            self.value = self.strategy.broker.getvalue()
+
+
+def run_backtest(
+    candles,
+    strategy,
+    params,
+    cash=100000.0,
+    commission=0.001,
+    percents=10,
+    compression=1,
+    warmup=0,
+):
+    """
+    run_backtest runs strategy with params over candles and returns its portfolio values
+    The strategy runs, and trades, over the first `warmup` candles too so its indicators
+    have history, start_value is the portfolio value when they are over
+    """
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.broker.set_cash(cash)
+    cerebro.addstrategy(strategy, **params)
+    cerebro.adddata(
+        ArrayData(
+            candles=candles, timeframe=bt.TimeFrame.Minutes, compression=compression
+        )
+    )
+    cerebro.addsizer(bt.sizers.PercentSizer, percents=percents)
+    cerebro.broker.setcommission(commission=commission)
+    cerebro.addanalyzer(_StartValue, _name="start_value", warmup=warmup)
+    with contextlib.redirect_stdout(io.StringIO()):
+        (result,) = cerebro.run()
+    return {
+        "start_value": result.analyzers.start_value.value,
+        "end_value": cerebro.broker.getvalue(),
+    }
+
+
+def _strategy_id(strategy):
+    """ _strategy_id names strategy and changes with its source code """
+    name = strategy.__module__ + "." + strategy.__qualname__
+    try:
+        source = inspect.getsource(strategy)
+    except (OSError, TypeError):
+        return name
+    return name + ":" + hashlib.sha1(source.encode()).hexdigest()
+
+
+# candles of the pool's worker processes, loaded once per process
+_worker_candles = None
+
+
+def _init_worker(source):
+    global _worker_candles
+    if isinstance(source, str):
+        _worker_candles = np.load(source, mmap_mode="r")
+    else:
+        _worker_candles = source
+
+
+def _run_job(job):
+    strategy, params, first, end, warmup, settings = job
+    return run_backtest(
+        _worker_candles[first:end], strategy, params, warmup=warmup, **settings
+    )
+
+
+def _warmup_rows(start, warmup):
+    """ _warmup_rows returns the first row run for a job and its number of warm-up rows """
+    first = max(start - warmup, 0)
+    return first, start - first
+
+
+class WindowRunner(object):
+    """
+    WindowRunner runs (strategy, params, start row, end row, warm-up rows) jobs over candles
+    Jobs run in a pool of processes unless processes is 0, which share a memory
+    mapped candle array when candles come from prepare_candles' cache,
+    and results are cached in the data folder unless use_cache is False
+    """
+
+    def __init__(
+        self,
+        candles,
+        cash=100000.0,
+        commission=0.001,
+        percents=10,
+        compression=1,
+        processes=None,
+        use_cache=True,
+    ):
+        self.candles = candles
+        self.settings = {
+            "cash": cash,
+            "commission": commission,
+            "percents": percents,
+            "compression": compression,
+        }
+        self.processes = processes
+        self.use_cache = use_cache
+        self.hits = 0
+        self.misses = 0
+        self._hashes = {}
+
+    def _window_hash(self, start, end):
+        if (start, end) not in self._hashes:
+            rows = np.ascontiguousarray(self.candles[start:end])
+            self._hashes[start, end] = hashlib.sha1(
+                memoryview(rows).cast("B")
+            ).hexdigest()
+        return self._hashes[start, end]
+
+    def _result_path(self, strategy, params, start, end, warmup):
+        first, warmup = _warmup_rows(start, warmup)
+        key = json.dumps(
+            [
+                RESULTS_VERSION,
+                _strategy_id(strategy),
+                params,
+                self.settings,
+                warmup,
+                self._window_hash(first, end),
+            ],
+            sort_keys=True,
+        )
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return get_data_path(os.path.join(RESULTS_DIRECTORY, digest + ".json"))
+
+    def _pool_source(self):
+        # a memory mapped .npy is reopened by each worker instead of being pickled,
+        # unless the candles are only part of it
+        filename = getattr(self.candles, "filename", None)
+        if isinstance(self.candles, np.memmap) and filename:
+            mapped = np.load(filename, mmap_mode="r")
+            if len(mapped) == len(self.candles) and np.array_equal(
+                mapped["datetime"][[0, -1]], self.candles["datetime"][[0, -1]]
+            ):
+                return filename
+        return self.candles
+
+    def run(self, jobs):
+        """
+        run returns the result of each (strategy, params, start, end, warmup) job, in order
+        A job runs rows [start - warmup, end), as far as there are rows before start,
+        and is valued from start on
+        """
+        results = [None] * len(jobs)
+        pending = []
+        for i, job in enumerate(jobs):
+            if self.use_cache:
+                path = self._result_path(*job)
+                if os.path.exists(path):
+                    with open(path, "r") as f:
+                        results[i] = json.load(f)
+                    continue
+            pending.append(i)
+        self.hits += len(jobs) - len(pending)
+        self.misses += len(pending)
+        logging.info(
+            "Running %d windows, %d cached", len(pending), len(jobs) - len(pending)
+        )
+
+        work = []
+        for i in pending:
+            strategy, params, start, end, warmup = jobs[i]
+            first, warmup = _warmup_rows(start, warmup)
+            work.append((strategy, params, first, end, warmup, self.settings))
+        if self.processes == 0 or len(work) <= 1:
+            computed = (
+                run_backtest(
+                    self.candles[first:end], strategy, params, warmup=warmup, **settings
+                )
+                for strategy, params, first, end, warmup, settings in work
+            )
+        else:
+            pool = ProcessPoolExecutor(
+                self.processes,
+                initializer=_init_worker,
+                initargs=(self._pool_source(),),
+            )
+            with pool:
+                computed = list(pool.map(_run_job, work, chunksize=4))
+
+        for i, result in zip(pending, computed):
+            results[i] = result
+            if self.use_cache:
+                path = self._result_path(*jobs[i])
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + ".tmp", "w") as f:
+                    json.dump(result, f)
+                os.replace(path + ".tmp", path)
+        return results
+
+
+def walk_forward(runner, strategy, param_grid, windows, warmup=0):
+    """
+    walk_forward picks the params of param_grid with the best return on each
+    window's train rows and tests them on its test rows
+    Both are run after the `warmup` rows before them, which should cover the longest
+    indicator period of param_grid, and valued from their first row, so params are
+    ranked by end_value / start_value and what they made during the warm-up is left out
+    With a single set of params nothing is trained and each window is just tested
+    """
+    param_grid = [dict(params) for params in param_grid]
+    best = [(param_grid[0], None)] * len(windows)
+    if len(param_grid) > 1:
+        trained = runner.run(
+            [
+                (strategy, params, window.start, window.split, warmup)
+                for window in windows
+                for params in param_grid
+            ]
+        )
+        best = []
+        for i in range(len(windows)):
+            values = [
+                result["end_value"] / result["start_value"]
+                for result in trained[i * len(param_grid) : (i + 1) * len(param_grid)]
+            ]
+            j = int(np.argmax(values))
+            best.append((param_grid[j], values[j]))
+
+    tested = runner.run(
+        [
+            (strategy, params, window.split, window.end, warmup)
+            for window, (params, _) in zip(windows, best)
+        ]
+    )
+    return [
+        WindowResult(
+            window, params, train_value, result["start_value"], result["end_value"]
+        )
+        for window, (params, train_value), result in zip(windows, best, tested)
+    ]
@@ -0,0 +1,9 @@
+"""
+Sharded market data collection across several worker processes or machines
+"""
+
+from .coordinator import Coordinator
+from .worker import Worker
+from .stub_exchange import StubExchange
+
+__all__ = ["Coordinator", "Worker", "StubExchange"]
@@ -0,0 +1,188 @@
+"""
+Command line entry point for sharded collection, run from the crypto folder:
+
+    python -m collector coordinator --port 8600 --pairs XXBTZUSD XETHZUSD
+    python -m collector coordinator --host 0.0.0.0  # reachable from other machines
+    python -m collector worker --id node1 --coordinator http://coordinator:8600
+    python -m collector merge crypto.db worker_node1.db worker_node2.db
+    python -m collector local --workers 3 --stub
+"""
+
+import argparse
+import logging
+import multiprocessing
+import time
+
+import kraken
+from database import DAO, DB_NAME
+from utils import pairs as pr
+from .coordinator import Coordinator, DEFAULT_WORKER_TIMEOUT
+from .stub_exchange import StubExchange
+from .worker import Worker, DEFAULT_POLL_INTERVAL, DEFAULT_HEARTBEAT_INTERVAL
+
+DEFAULT_PAIRS = [pr.PAIR_XBT_USD, pr.PAIR_ETH_USD]
+DEFAULT_PORT = 8600
+# the stub exchange has no rate limit for workers to respect
+STUB_MAX_CALL_COUNTER = 10 ** 6
+
+
+def _run_worker(
+    worker_id,
+    coordinator_uri,
+    api_uri,
+    poll_interval,
+    heartbeat_interval,
+    max_call_counter=kraken.api.MAX_CALL_COUNTER,
+):
+    logging.basicConfig(level=logging.INFO)
+    Worker(
+        worker_id,
+        coordinator_uri,
+        api_uri=api_uri,
+        poll_interval=poll_interval,
+        heartbeat_interval=heartbeat_interval,
+        max_call_counter=max_call_counter,
+    ).run()
+
+
+def run_local(
+    pairs,
+    workers,
+    database=DB_NAME,
+    stub=False,
+    duration=None,
+    poll_interval=DEFAULT_POLL_INTERVAL,
+    heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL,
+    worker_timeout=DEFAULT_WORKER_TIMEOUT,
+):
+    """
+    run_local runs a coordinator and `workers` worker processes on this machine,
+    optionally against a stub exchange, and restarts workers that die
+    """
+    exchange = StubExchange(pairs=pairs).start() if stub else None
+    api_uri = exchange.uri if exchange else None
+    coordinator = Coordinator(pairs, database, worker_timeout).start()
+
+    def spawn(worker_id):
+        process = multiprocessing.Process(
+            target=_run_worker,
+            args=(
+                worker_id,
+                coordinator.uri,
+                api_uri,
+                poll_interval,
+                heartbeat_interval,
+                STUB_MAX_CALL_COUNTER if stub else kraken.api.MAX_CALL_COUNTER,
+            ),
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    processes = {"local%d" % i: None for i in range(workers)}
+    deadline = None if duration is None else time.monotonic() + duration
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            for worker_id, process in processes.items():
+                if process is None or not process.is_alive():
+                    if process is not None:
+                        logging.warning("Worker %s died, restarting it", worker_id)
+                    processes[worker_id] = spawn(worker_id)
+            time.sleep(heartbeat_interval)
+    finally:
+        for process in processes.values():
+            if process is not None:
+                process.terminate()
+                process.join()
+        coordinator.shutdown()
+        if exchange:
+            exchange.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="collector", description=__doc__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    coordinator = subparsers.add_parser("coordinator")
+    coordinator.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="interface to listen on, submit_snapshots is unauthenticated so only "
+        "listen on others, eg. 0.0.0.0, on a trusted network",
+    )
+    coordinator.add_argument("--port", type=int, default=DEFAULT_PORT)
+    coordinator.add_argument("--pairs", nargs="+", default=DEFAULT_PAIRS)
+    coordinator.add_argument("--database", default=DB_NAME)
+    coordinator.add_argument(
+        "--worker-timeout", type=float, default=DEFAULT_WORKER_TIMEOUT
+    )
+
+    worker = subparsers.add_parser("worker")
+    worker.add_argument("--id", required=True)
+    worker.add_argument("--coordinator", required=True)
+    worker.add_argument("--database")
+    worker.add_argument("--api-uri", help="exchange uri, e.g. a stub exchange")
+    worker.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL)
+    worker.add_argument(
+        "--max-call-counter",
+        type=int,
+        default=kraken.api.MAX_CALL_COUNTER,
+        help="api call counter to pause at, raise it for a stub exchange",
+    )
+
+    merge = subparsers.add_parser("merge")
+    merge.add_argument("database")
+    merge.add_argument("sources", nargs="+")
+
+    local = subparsers.add_parser("local")
+    local.add_argument("--workers", type=int, default=2)
+    local.add_argument("--pairs", nargs="+", default=DEFAULT_PAIRS)
+    local.add_argument("--database", default=DB_NAME)
+    local.add_argument(
+        "--stub", action="store_true", help="collect from a stub exchange"
+    )
+    local.add_argument("--duration", type=float)
+    local.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL)
+
+    stub = subparsers.add_parser("stub")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=DEFAULT_PORT + 1)
+
+    args = parser.parse_args(argv)
+    if args.command == "coordinator":
+        Coordinator(args.pairs, args.database, args.worker_timeout).serve(
+            args.host, args.port
+        )
+    elif args.command == "worker":
+        Worker(
+            args.id,
+            args.coordinator,
+            database=args.database,
+            api_uri=args.api_uri,
+            poll_interval=args.poll_interval,
+            max_call_counter=args.max_call_counter,
+        ).run()
+    elif args.command == "merge":
+        dao = DAO(args.database)
+        dao.create_tables()
+        for source in args.sources:
+            logging.info(
+                "Merged %d snapshots from %s", dao.merge_database(source), source
+            )
+        dao.close()
+    elif args.command == "local":
+        run_local(
+            args.pairs,
+            args.workers,
+            args.database,
+            stub=args.stub,
+            duration=args.duration,
+            poll_interval=args.poll_interval,
+        )
+    elif args.command == "stub":
+        StubExchange(args.host, args.port).serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import threading
+import time
+from xmlrpc.server import SimpleXMLRPCServer
+
+from database import DAO, DB_NAME
+
+DEFAULT_WORKER_TIMEOUT = 15.0
+
+
+def _weight(pair, worker_id):
+    digest = hashlib.sha1(("%s:%s" % (pair, worker_id)).encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def assign_pairs(pairs, worker_ids):
+    """
+    assign_pairs maps each pair to the worker with the highest rendezvous hash weight
+    When a worker joins or leaves, only the pairs it owned or gains move
+    """
+    assignments = {worker_id: [] for worker_id in worker_ids}
+    if not assignments:
+        return assignments
+    for pair in pairs:
+        owner = max(worker_ids, key=lambda worker_id: _weight(pair, worker_id))
+        assignments[owner].append(pair)
+    return assignments
+
+
+class Coordinator(object):
+    """
+    Coordinator hands out pairs to the workers that heartbeat it and stores the
+    snapshots they submit in the central database
+    A worker that misses heartbeats for worker_timeout seconds is dropped and
+    its pairs are rebalanced over the remaining workers
+    """
+
+    def __init__(
+        self,
+        pairs,
+        database=DB_NAME,
+        worker_timeout=DEFAULT_WORKER_TIMEOUT,
+        clock=time.monotonic,
+    ):
+        self.pairs = list(pairs)
+        self.database = database
+        self.worker_timeout = worker_timeout
+        self._clock = clock
+        self._workers = {}
+        self._lock = threading.Lock()
+        self._dao = None
+        self._server = None
+
+    def _prune(self):
+        now = self._clock()
+        for worker_id, last_seen in list(self._workers.items()):
+            if now - last_seen > self.worker_timeout:
+                logging.warning("Worker %s timed out, rebalancing its pairs", worker_id)
+                del self._workers[worker_id]
+
+    def live_workers(self):
+        with self._lock:
+            self._prune()
+            return sorted(self._workers)
+
+    def assignments(self):
+        return assign_pairs(self.pairs, self.live_workers())
+
+    def register(self, worker_id):
+        logging.info("Worker %s registered", worker_id)
+        return self.heartbeat(worker_id)
+
+    def heartbeat(self, worker_id):
+        """ heartbeat marks worker_id as alive and returns the pairs it should collect """
+        with self._lock:
+            self._workers[worker_id] = self._clock()
+        return self.assignments()[worker_id]
+
+    def unregister(self, worker_id):
+        logging.info("Worker %s unregistered", worker_id)
+        with self._lock:
+            self._workers.pop(worker_id, None)
+        return True
+
+    def submit_snapshots(self, worker_id, rows):
+        """
+        submit_snapshots stores (pair, snapshot_epoch, ask_count, levels) rows
+        Rows already stored are ignored, so a worker can safely resend a batch
+        """
+        inserted = self._dao.bulk_insert_orderbook_snapshot_rows(
+            (
+                (pair, epoch, ask_count, levels.data)
+                for pair, epoch, ask_count, levels in rows
+            ),
+            ignore_duplicates=True,
+        )
+        logging.debug("Worker %s submitted %d snapshots", worker_id, inserted)
+        return inserted
+
+    def serve(self, host="127.0.0.1", port=0, ready=None):
+        """
+        serve answers worker requests over xml-rpc until shutdown is called
+        ready, if given, is set once the server is listening
+        """
+        # sqlite connections belong to the thread that created them
+        self._dao = DAO(self.database)
+        self._dao.create_tables()
+        self._server = SimpleXMLRPCServer(
+            (host, port), allow_none=True, logRequests=False
+        )
+        for function in (
+            self.register,
+            self.heartbeat,
+            self.unregister,
+            self.submit_snapshots,
+        ):
+            self._server.register_function(function)
+        logging.info("Coordinator listening on %s for pairs %s", self.uri, self.pairs)
+        if ready is not None:
+            ready.set()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            self._dao.close()
+
+    def start(self, host="127.0.0.1", port=0):
+        """ start serves in a background thread and returns once it is listening """
+        ready = threading.Event()
+        threading.Thread(
+            target=self.serve, args=(host, port, ready), daemon=True
+        ).start()
+        ready.wait()
+        return self
+
+    @property
+    def uri(self):
+        host, port = self._server.server_address[:2]
+        return "http://%s:%d" % (host, port)
+
+    def shutdown(self):
+        self._server.shutdown()
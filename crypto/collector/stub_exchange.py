@@ -0,0 +1,157 @@
+import json
+import logging
+import threading
+import time
+import urllib.parse
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+DEFAULT_DEPTH_COUNT = 100
+DEFAULT_TRADE_INTERVAL = 0.5
+TRADES_PAGE_SIZE = 1000
+START_PRICE = 10000.0
+
+
+class StubExchange(object):
+    """
+    StubExchange serves deterministic synthetic data on the Kraken public endpoints
+    Time, Depth, Trades and AssetPairs, so collectors can be run and tested offline
+
+    Trades happen every trade_interval seconds from start_epoch, except inside
+    the (start, end) windows listed in quiet_periods
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        pairs=None,
+        start_epoch=None,
+        trade_interval=DEFAULT_TRADE_INTERVAL,
+        quiet_periods=(),
+        clock=time.time,
+    ):
+        self.pairs = list(pairs or [])
+        self.trade_interval = trade_interval
+        self.quiet_periods = list(quiet_periods)
+        self.clock = clock
+        self.start_epoch = clock() if start_epoch is None else start_epoch
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def uri(self):
+        host, port = self._server.server_address[:2]
+        return "http://%s:%d" % (host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logging.info("Stub exchange listening on %s", self.uri)
+        return self
+
+    def serve_forever(self):
+        logging.info("Stub exchange listening on %s", self.uri)
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        exchange = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                data = dict(urllib.parse.parse_qsl(self.rfile.read(length).decode()))
+                method = self.path.rsplit("/", 1)[-1]
+                body = json.dumps(exchange.handle(method, data)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug(format, *args)
+
+        return Handler
+
+    def handle(self, method, data):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        handler = getattr(self, "_" + method.lower(), None)
+        if handler is None:
+            return {"error": ["EQuery:Unknown method"]}
+        try:
+            return {"error": [], "result": handler(data)}
+        except KeyError as e:
+            return {"error": ["EGeneral:Invalid arguments:%s" % e]}
+
+    def _time(self, data):
+        now = self.clock()
+        return {
+            "unixtime": int(now),
+            "rfc1123": time.strftime("%a, %d %b %y %H:%M:%S +0000", time.gmtime(now)),
+        }
+
+    def _assetpairs(self, data):
+        return {pair: {"altname": pair} for pair in self.pairs}
+
+    def _mid(self, pair, epoch):
+        phase = zlib.crc32(pair.encode()) % 1000
+        return START_PRICE * (1 + 0.01 * np.sin((epoch + phase) / 600.0))
+
+    def _depth(self, data):
+        pair = data["pair"]
+        count = int(data.get("count", DEFAULT_DEPTH_COUNT))
+        now = self.clock()
+        mid = self._mid(pair, now)
+        rng = np.random.default_rng([zlib.crc32(pair.encode()), int(now)])
+        book = {}
+        for side, sign in (("asks", 1), ("bids", -1)):
+            prices = mid + sign * np.cumsum(rng.exponential(mid * 1e-5, count))
+            volumes = rng.lognormal(-1.0, 1.0, count)
+            epochs = int(now) - rng.integers(0, 600, count)
+            book[side] = [
+                ["%.5f" % p, "%.8f" % v, int(t)]
+                for p, v, t in zip(prices.tolist(), volumes.tolist(), epochs.tolist())
+            ]
+        return {pair: book}
+
+    def _is_quiet(self, epoch):
+        return any(start <= epoch < end for start, end in self.quiet_periods)
+
+    def _trades(self, data):
+        """ trades after the since cursor, which like Kraken's is in nanoseconds """
+        pair = data["pair"]
+        since = int(data.get("since") or 0) / 1e9
+        now = self.clock()
+        index = max(int((since - self.start_epoch) // self.trade_interval) + 1, 0)
+        trades = []
+        while len(trades) < TRADES_PAGE_SIZE:
+            epoch = round(self.start_epoch + index * self.trade_interval, 4)
+            if epoch > now:
+                break
+            index += 1
+            if epoch <= since or self._is_quiet(epoch):
+                continue
+            price = self._mid(pair, epoch)
+            trades.append(
+                [
+                    "%.5f" % price,
+                    "%.8f" % 0.01,
+                    epoch,
+                    "b" if index % 2 else "s",
+                    "l",
+                    "",
+                ]
+            )
+        last = trades[-1][2] if trades else since
+        return {pair: trades, "last": str(int(round(last * 1e9)))}
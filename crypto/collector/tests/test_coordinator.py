@@ -0,0 +1,94 @@
+import multiprocessing
+import time
+
+from collector import Coordinator, StubExchange, Worker
+from collector.coordinator import assign_pairs
+from database import DAO
+
+PAIRS = ["P%d" % i for i in range(20)]
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_assign_pairs_covers_every_pair_once():
+    assignments = assign_pairs(PAIRS, ["a", "b", "c"])
+    assigned = sorted(pair for pairs in assignments.values() for pair in pairs)
+    assert assigned == sorted(PAIRS)
+    assert all(assignments.values())
+
+
+def test_assign_pairs_only_moves_pairs_of_removed_worker():
+    before = assign_pairs(PAIRS, ["a", "b", "c"])
+    after = assign_pairs(PAIRS, ["a", "b"])
+    assert set(before["a"]) <= set(after["a"])
+    assert set(before["b"]) <= set(after["b"])
+    assert set(after["a"]) | set(after["b"]) == set(PAIRS)
+
+
+def test_dead_worker_is_rebalanced():
+    clock = FakeClock()
+    coordinator = Coordinator(PAIRS, worker_timeout=10, clock=clock)
+    for worker_id in ("a", "b", "c"):
+        coordinator.register(worker_id)
+
+    clock.now = 8
+    coordinator.heartbeat("a")
+    coordinator.heartbeat("b")
+    clock.now = 12
+    assert coordinator.live_workers() == ["a", "b"]
+    assert sorted(coordinator.heartbeat("a") + coordinator.heartbeat("b")) == sorted(
+        PAIRS
+    )
+
+
+def _run_worker(worker_id, coordinator_uri, api_uri, duration):
+    Worker(
+        worker_id,
+        coordinator_uri,
+        api_uri=api_uri,
+        poll_interval=0.05,
+        heartbeat_interval=0.1,
+        # the stub exchange does not rate limit
+        max_call_counter=10 ** 6,
+    ).run(duration)
+
+
+def test_local_workers_collect_every_pair_without_duplicates(tmp_path, monkeypatch):
+    monkeypatch.setenv("CRYPTO_DATA_DIR", str(tmp_path))
+    pairs = PAIRS[:4]
+    exchange = StubExchange(pairs=pairs).start()
+    coordinator = Coordinator(pairs, "central.db", worker_timeout=0.5).start()
+
+    survivor = multiprocessing.Process(
+        target=_run_worker, args=("a", coordinator.uri, exchange.uri, 3.0)
+    )
+    victim = multiprocessing.Process(
+        target=_run_worker, args=("b", coordinator.uri, exchange.uri, 30.0)
+    )
+    survivor.start()
+    victim.start()
+    time.sleep(1.0)
+    victim.kill()
+    killed_at = time.time()
+    survivor.join()
+    victim.join()
+    coordinator.shutdown()
+    exchange.stop()
+
+    central = DAO("central.db")
+    # the survivor took over the pairs of the killed worker
+    for pair in pairs:
+        assert list(central.iter_orderbook_snapshots(pair, start=killed_at + 0.5))
+
+    # the survivor pushed everything it collected, the killed worker may have
+    # died before its last push but merging its buffer twice adds nothing new
+    assert central.merge_database(str(tmp_path / "worker_a.db")) == 0
+    central.merge_database(str(tmp_path / "worker_b.db"))
+    assert central.merge_database(str(tmp_path / "worker_b.db")) == 0
+    central.close()
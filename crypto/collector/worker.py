@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+import xmlrpc.client
+
+import requests
+
+import kraken
+from database import DAO
+from orderbook import OrderbookSnapshot
+
+DEFAULT_POLL_INTERVAL = 3.0
+DEFAULT_HEARTBEAT_INTERVAL = 5.0
+SYNC_BATCH_SIZE = 50
+RATE_LIMIT_SLEEP = 0.1
+
+
+class Worker(object):
+    """
+    Worker collects orderbook snapshots of the pairs the coordinator assigns it
+    Snapshots are buffered in a local database and pushed to the coordinator after
+    every round, so nothing is lost while the coordinator is unreachable
+    """
+
+    def __init__(
+        self,
+        worker_id,
+        coordinator_uri,
+        database=None,
+        api_uri=None,
+        poll_interval=DEFAULT_POLL_INTERVAL,
+        heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL,
+        max_call_counter=kraken.api.MAX_CALL_COUNTER,
+    ):
+        self.worker_id = worker_id
+        self.coordinator_uri = coordinator_uri
+        self.database = database or "worker_%s.db" % worker_id
+        self.api_uri = api_uri
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.max_call_counter = max_call_counter
+        self.pairs = []
+        self._synced_id = 0
+        self._stop = threading.Event()
+
+    def _heartbeat_loop(self):
+        coordinator = xmlrpc.client.ServerProxy(self.coordinator_uri, allow_none=True)
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                pairs = coordinator.heartbeat(self.worker_id)
+            except (OSError, xmlrpc.client.Error) as e:
+                logging.warning("Worker %s heartbeat failed: %s", self.worker_id, e)
+                continue
+            if pairs != self.pairs:
+                logging.info("Worker %s now collecting %s", self.worker_id, pairs)
+                self.pairs = pairs
+
+    def collect_once(self, api, dao):
+        """ collect_once stores one snapshot of every assigned pair """
+        for pair in list(self.pairs):
+            while api.at_api_limit() and not self._stop.is_set():
+                time.sleep(RATE_LIMIT_SLEEP)
+            try:
+                res = api.query_public("Depth", data={"pair": pair})
+            except kraken.RateLimitError:
+                logging.warning("Rate limit hit...")
+                continue
+            except (requests.RequestException, RuntimeError) as e:
+                logging.warning(
+                    "Worker %s failed to get %s: %s", self.worker_id, pair, e
+                )
+                continue
+            dao.insert_orderbook_snapshot(OrderbookSnapshot.from_depth(pair, res[pair]))
+
+    def sync(self, dao, coordinator):
+        """ sync pushes the snapshots the coordinator has not acknowledged yet """
+        while True:
+            rows = list(
+                dao.iter_orderbook_snapshot_rows(self._synced_id, SYNC_BATCH_SIZE)
+            )
+            if not rows:
+                return
+            try:
+                coordinator.submit_snapshots(
+                    self.worker_id,
+                    [
+                        (pair, epoch, ask_count, xmlrpc.client.Binary(bytes(levels)))
+                        for _, pair, epoch, ask_count, levels in rows
+                    ],
+                )
+            except (OSError, xmlrpc.client.Error) as e:
+                logging.warning("Worker %s sync failed: %s", self.worker_id, e)
+                return
+            self._synced_id = rows[-1][0]
+
+    def run(self, duration=None):
+        """ run collects until stop is called or duration seconds have passed """
+        api = kraken.API(max_call_counter=self.max_call_counter)
+        if self.api_uri:
+            api.uri = self.api_uri
+        dao = DAO(self.database)
+        dao.create_tables()
+        coordinator = xmlrpc.client.ServerProxy(self.coordinator_uri, allow_none=True)
+        self.pairs = coordinator.register(self.worker_id)
+        logging.info("Worker %s collecting %s", self.worker_id, self.pairs)
+
+        heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        heartbeat.start()
+        deadline = None if duration is None else time.monotonic() + duration
+        try:
+            while not self._stop.is_set():
+                self.collect_once(api, dao)
+                self.sync(dao, coordinator)
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                self._stop.wait(self.poll_interval)
+        finally:
+            self._stop.set()
+            try:
+                coordinator.unregister(self.worker_id)
+            except (OSError, xmlrpc.client.Error):
+                pass
+            heartbeat.join()
+            dao.close()
+            api.close()
+
+    def stop(self):
+        self._stop.set()
@@ -1 +1,6 @@
+import os
+
 DB_NAME = "crypto.db"
+SQL_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql")
+# tables in migration order
+TABLES = ["raw_orderbook", "orderbook_snapshot", "collector_uptime"]
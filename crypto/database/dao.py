@@ -1,6 +1,11 @@
+import itertools
+import os
 import sqlite3
 
-from .consts import DB_NAME
+import numpy as np
+
+from .consts import DB_NAME, SQL_DIRECTORY, TABLES
+from orderbook import OrderbookSnapshot, LEVEL_DTYPE
 from utils import get_data_path
 
 
@@ -8,9 +13,30 @@ class DAO(object):
     """ DAO is the database access object for sqlite3 """
 
     def __init__(self, database=DB_NAME):
-        self._conn = sqlite3.connect(get_data_path(DB_NAME))
+        if database != ":memory:" and not os.path.isabs(database):
+            database = get_data_path(database)
+        self._conn = sqlite3.connect(database)
+
+    def create_tables(self):
+        """ create_tables runs the up migration of every known table """
+        for table in TABLES:
+            with open(os.path.join(SQL_DIRECTORY, table + ".up.sql"), "r") as f:
+                self._conn.executescript(f.read())
+        self._conn.commit()
+
+    def drop_tables(self):
+        """ drop_tables runs the down migration of every known table """
+        for table in reversed(TABLES):
+            with open(os.path.join(SQL_DIRECTORY, table + ".down.sql"), "r") as f:
+                self._conn.executescript(f.read())
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
 
     def bulk_insert_raw_orderbook(self, columns):
+        if isinstance(columns, OrderbookSnapshot):
+            columns = columns.rows()
         cursor = self._conn.cursor()
         cursor.executemany(
             (
@@ -20,3 +46,171 @@ class DAO(object):
             columns,
         )
         self._conn.commit()
+
+    def insert_orderbook_snapshot(self, snapshot):
+        self.bulk_insert_orderbook_snapshots([snapshot])
+
+    def bulk_insert_orderbook_snapshots(self, snapshots, ignore_duplicates=False):
+        """ stores each snapshot as a single row with its levels packed into a blob """
+        return self.bulk_insert_orderbook_snapshot_rows(
+            (
+                (s.pair, s.snapshot_epoch, s.ask_count, memoryview(s.levels).cast("B"))
+                for s in snapshots
+            ),
+            ignore_duplicates,
+        )
+
+    def bulk_insert_orderbook_snapshot_rows(self, rows, ignore_duplicates=False):
+        """
+        stores (pair, snapshot_epoch, ask_count, levels blob) rows
+        with ignore_duplicates a snapshot already stored for the same pair and epoch is skipped
+        returns the number of rows inserted
+        """
+        cursor = self._conn.cursor()
+        cursor.executemany(
+            (
+                "INSERT "
+                + ("OR IGNORE " if ignore_duplicates else "")
+                + "INTO orderbook_snapshot (pair,"
+                " snapshot_epoch, ask_count, levels) VALUES (?, ?, ?, ?)"
+            ),
+            rows,
+        )
+        self._conn.commit()
+        return cursor.rowcount
+
+    def iter_orderbook_snapshot_rows(self, after_id=0, limit=None):
+        """ yields (id, pair, snapshot_epoch, ask_count, levels blob) rows in insertion order """
+        query = (
+            "SELECT id, pair, snapshot_epoch, ask_count, levels FROM orderbook_snapshot"
+            " WHERE id > ? ORDER BY id"
+        )
+        params = [after_id]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        yield from self._conn.execute(query, params)
+
+    def merge_database(self, path):
+        """
+        merge_database copies the snapshots of another database file into this one
+        snapshots already stored for the same pair and epoch are skipped,
+        so merging the same file twice is harmless
+        returns the number of rows inserted
+        """
+        self._conn.execute("ATTACH DATABASE ? AS other", (path,))
+        try:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO orderbook_snapshot"
+                " (pair, snapshot_epoch, ask_count, levels)"
+                " SELECT pair, snapshot_epoch, ask_count, levels"
+                " FROM other.orderbook_snapshot ORDER BY snapshot_epoch"
+            )
+            self._conn.commit()
+        finally:
+            self._conn.execute("DETACH DATABASE other")
+        return cursor.rowcount
+
+    def iter_raw_orderbook_snapshots(self, pair=None, start=None, end=None):
+        """
+        yields the levels stored one row each in raw_orderbook grouped back into
+        snapshots, oldest first, with start <= snapshot_epoch < end
+        """
+        query = (
+            "SELECT pair, snapshot_epoch, price, volume, is_ask, order_epoch"
+            " FROM raw_orderbook WHERE 1"
+        )
+        params = []
+        if pair is not None:
+            query += " AND pair = ?"
+            params.append(pair)
+        if start is not None:
+            query += " AND snapshot_epoch >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND snapshot_epoch < ?"
+            params.append(end)
+        # asks by ascending then bids by descending price, as in OrderbookSnapshot
+        query += (
+            " ORDER BY snapshot_epoch, pair, is_ask DESC,"
+            " CASE WHEN is_ask THEN price ELSE -price END"
+        )
+        rows = self._conn.execute(query, params)
+        for (pair, snapshot_epoch), levels in itertools.groupby(
+            rows, key=lambda row: (row[0], row[1])
+        ):
+            levels = [
+                (price, volume, ask, order_epoch)
+                for _, _, price, volume, ask, order_epoch in levels
+            ]
+            array = np.empty(len(levels), dtype=LEVEL_DTYPE)
+            array["price"], array["volume"], is_ask, array["order_epoch"] = zip(*levels)
+            yield OrderbookSnapshot(pair, snapshot_epoch, sum(is_ask), array)
+
+    def migrate_raw_orderbook(self, batch_size=500):
+        """
+        migrate_raw_orderbook copies the raw_orderbook history into orderbook_snapshot,
+        snapshots already there are skipped so it can be run again
+        returns the number of snapshots inserted
+        """
+        snapshots = self.iter_raw_orderbook_snapshots()
+        inserted = 0
+        while True:
+            batch = list(itertools.islice(snapshots, batch_size))
+            if not batch:
+                return inserted
+            inserted += self.bulk_insert_orderbook_snapshots(
+                batch, ignore_duplicates=True
+            )
+
+    def iter_orderbook_snapshots(self, pair, start=None, end=None):
+        """ yields the snapshots of pair with start <= snapshot_epoch < end, oldest first """
+        query = (
+            "SELECT snapshot_epoch, ask_count, levels FROM orderbook_snapshot"
+            " WHERE pair = ?"
+        )
+        params = [pair]
+        if start is not None:
+            query += " AND snapshot_epoch >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND snapshot_epoch < ?"
+            params.append(end)
+        query += " ORDER BY snapshot_epoch"
+        for snapshot_epoch, ask_count, levels in self._conn.execute(query, params):
+            yield OrderbookSnapshot.from_bytes(pair, snapshot_epoch, ask_count, levels)
+
+    def first_orderbook_snapshot_epoch(self, pair):
+        """ returns the epoch of pair's oldest snapshot in orderbook_snapshot, None without one """
+        (epoch,) = self._conn.execute(
+            "SELECT MIN(snapshot_epoch) FROM orderbook_snapshot WHERE pair = ?", (pair,)
+        ).fetchone()
+        return epoch
+
+    def insert_uptime(self, source, pair, start_epoch, end_epoch):
+        """
+        insert_uptime records that source collected everything pair had in
+        [start_epoch, end_epoch] and returns the id of the record, see extend_uptime
+        """
+        cursor = self._conn.execute(
+            "INSERT INTO collector_uptime (source, pair, start_epoch, end_epoch)"
+            " VALUES (?, ?, ?, ?)",
+            (source, pair, start_epoch, end_epoch),
+        )
+        self._conn.commit()
+        return cursor.lastrowid
+
+    def extend_uptime(self, uptime_id, end_epoch):
+        self._conn.execute(
+            "UPDATE collector_uptime SET end_epoch = MAX(end_epoch, ?) WHERE id = ?",
+            (end_epoch, uptime_id),
+        )
+        self._conn.commit()
+
+    def get_uptime(self, pair):
+        """ returns the (start_epoch, end_epoch) intervals recorded for pair, by start """
+        return self._conn.execute(
+            "SELECT start_epoch, end_epoch FROM collector_uptime"
+            " WHERE pair = ? ORDER BY start_epoch",
+            (pair,),
+        ).fetchall()
@@ -0,0 +1,2 @@
+DROP INDEX IF EXISTS collector_uptime_pair_start;
+DROP TABLE IF EXISTS collector_uptime;
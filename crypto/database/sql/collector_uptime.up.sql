@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS collector_uptime(
+    id INTEGER PRIMARY KEY,
+    source VARCHAR(40) NOT NULL,
+    pair VARCHAR(20) NOT NULL,
+    start_epoch REAL NOT NULL,
+    end_epoch REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS collector_uptime_pair_start
+    ON collector_uptime(pair, start_epoch);
@@ -0,0 +1,2 @@
+DROP INDEX IF EXISTS orderbook_snapshot_pair_epoch;
+DROP TABLE IF EXISTS orderbook_snapshot;
\ No newline at end of file
@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS orderbook_snapshot(
+    id INTEGER PRIMARY KEY,
+    pair VARCHAR(20) NOT NULL,
+    snapshot_epoch REAL NOT NULL,
+    ask_count INTEGER NOT NULL,
+    levels BLOB NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS orderbook_snapshot_pair_epoch
+    ON orderbook_snapshot(pair, snapshot_epoch);
@@ -1 +1,2 @@
-DROP TABLE IF EXISTS raw_orderbook;
\ No newline at end of file
+DROP INDEX IF EXISTS raw_orderbook_pair_epoch;
+DROP TABLE IF EXISTS raw_orderbook;
@@ -1,4 +1,4 @@
-CREATE TABLE raw_orderbook(
+CREATE TABLE IF NOT EXISTS raw_orderbook(
     id INTEGER PRIMARY KEY,
     pair VARCHAR(20) NOT NULL,
     price REAL NOT NULL,
@@ -6,4 +6,6 @@ CREATE TABLE raw_orderbook(
     is_ask BOOLEAN NOT NULL,
     order_epoch INTEGER NOT NULL,
     snapshot_epoch REAL NOT NULL
-);
\ No newline at end of file
+);
+CREATE INDEX IF NOT EXISTS raw_orderbook_pair_epoch
+    ON raw_orderbook(pair, snapshot_epoch);
@@ -0,0 +1,23 @@
+"""
+Gap detection and repair for trade history: gaps between trades are found with
+vectorized diffs, classified against recorded collector uptime, and only the
+windows no collector covered are backfilled
+"""
+
+from .scanner import Gap, QUIET, OUTAGE, DEFAULT_MIN_GAP
+from .scanner import find_gaps, scan_trades, classify_gaps, synthetic_windows
+from .backfill import fetch_window, merge_trades, repair_trades
+
+__all__ = [
+    "Gap",
+    "QUIET",
+    "OUTAGE",
+    "DEFAULT_MIN_GAP",
+    "find_gaps",
+    "scan_trades",
+    "classify_gaps",
+    "synthetic_windows",
+    "fetch_window",
+    "merge_trades",
+    "repair_trades",
+]
@@ -0,0 +1,43 @@
+"""
+Command line entry point for gap detection and repair, run from the crypto folder:
+
+    python -m gaps scan XXBTZUSD --min-gap 600
+    python -m gaps repair XXBTZUSD XETHZUSD
+"""
+
+import argparse
+import logging
+
+import kraken
+from database import DAO, DB_NAME
+from .backfill import repair_trades
+from .scanner import DEFAULT_MIN_GAP
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m gaps")
+    parser.add_argument("command", choices=["scan", "repair"])
+    parser.add_argument("pairs", nargs="+")
+    parser.add_argument("--min-gap", type=float, default=DEFAULT_MIN_GAP)
+    parser.add_argument("--database", default=DB_NAME)
+    parser.add_argument("--api-uri", help="query another Kraken compatible server")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    dao = DAO(args.database)
+    dao.create_tables()
+    api = kraken.API()
+    if args.api_uri:
+        api.uri = args.api_uri
+    for pair in args.pairs:
+        gaps, inserted = repair_trades(
+            pair, api, dao, args.min_gap, dry_run=args.command == "scan"
+        )
+        for gap in gaps:
+            print(f"{pair},{gap.start},{gap.end},{gap.end - gap.start:.4f},{gap.kind}")
+        if args.command == "repair":
+            print(f"{pair}: inserted {inserted} trades")
+
+
+if __name__ == "__main__":
+    main()
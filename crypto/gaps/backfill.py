@@ -0,0 +1,122 @@
+import csv
+import heapq
+import io
+import logging
+import os
+import time
+
+import archive
+import kraken
+from database import DAO
+from utils import consts, get_data_path
+from .scanner import DEFAULT_MIN_GAP, OUTAGE, TIME_COLUMN, classify_gaps, scan_trades
+
+BACKFILL_SOURCE = "backfill"
+RATE_LIMIT_SLEEP = 15
+
+
+def to_cursor(seconds):
+    """ to_cursor turns a trade time into a Trades `since` cursor, in nanoseconds """
+    return str(int(seconds * 10000) * 10 ** 5)
+
+
+def fetch_window(api, pair, start, end):
+    """
+    fetch_window pages through the Trades endpoint from start
+    and returns the trades with start < time < end
+    """
+    since = to_cursor(start)
+    trades = []
+    while True:
+        if api.at_api_limit():
+            time.sleep(1)
+            continue
+        try:
+            r = api.query_public("Trades", data={"pair": pair, "since": since})
+        except kraken.RateLimitError:
+            logging.warning(
+                "Rate limit hit. Sleeping for %d seconds...", RATE_LIMIT_SLEEP
+            )
+            time.sleep(RATE_LIMIT_SLEEP)
+            continue
+        page = r[pair]
+        trades.extend(
+            trade for trade in page if start < float(trade[TIME_COLUMN]) < end
+        )
+        if not page or float(page[-1][TIME_COLUMN]) >= end or r["last"] == since:
+            return trades
+        since = r["last"]
+
+
+def _line_time(line):
+    try:
+        return float(line.split(",", TIME_COLUMN + 1)[TIME_COLUMN])
+    except (ValueError, IndexError):
+        # the header sorts first
+        return float("-inf")
+
+
+def merge_trades(path, trades):
+    """
+    merge_trades inserts trades into the time sorted trades csv at path,
+    rewriting it once however many windows the trades come from
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        sorted(trades, key=lambda trade: float(trade[TIME_COLUMN]))
+    )
+    lines = buffer.getvalue().splitlines(keepends=True)
+    with open(path, "r", newline="") as src:
+        with open(path + ".tmp", "w", newline="") as dst:
+            dst.writelines(heapq.merge(src, lines, key=_line_time))
+    os.replace(path + ".tmp", path)
+
+
+def repair_trades(pair, api=None, dao=None, min_gap=DEFAULT_MIN_GAP, dry_run=False):
+    """
+    repair_trades scans pair's trade history for gaps, backfills the ones
+    no recorded uptime covers and records the backfilled windows as uptime,
+    so they are quiet on the next scan
+    returns the classified gaps and the number of trades inserted
+    """
+    api = api or kraken.API()
+    dao = dao or DAO()
+    path = get_data_path(pair + consts.TRADES_AFFIX)
+
+    gaps = classify_gaps(scan_trades(pair, min_gap), dao.get_uptime(pair))
+    outages = [gap for gap in gaps if gap.kind == OUTAGE]
+    logging.info(
+        "Found %d gaps in %s trades, %d not covered by a collector",
+        len(gaps),
+        pair,
+        len(outages),
+    )
+    if dry_run or not outages:
+        return gaps, 0
+
+    # trades are merged into the csv, so gaps in the months archive_trades pruned
+    # from it can not be backfilled without breaking archive.open_trades
+    first = archive.first_row_time(path, archive.TRADES)
+    pruned = [gap for gap in outages if first is None or gap.start < first]
+    if pruned:
+        logging.warning(
+            "Skipping %d gaps in %s trades pruned from %s", len(pruned), pair, path
+        )
+        outages = [gap for gap in outages if first is not None and gap.start >= first]
+
+    trades = []
+    for gap in outages:
+        window = fetch_window(api, pair, gap.start, gap.end)
+        logging.info(
+            "Backfilled %d trades of %s between %f and %f",
+            len(window),
+            pair,
+            gap.start,
+            gap.end,
+        )
+        trades.extend(window)
+    if trades:
+        merge_trades(path, trades)
+    for gap in outages:
+        dao.insert_uptime(BACKFILL_SOURCE, pair, gap.start, gap.end)
+    return gaps, len(trades)
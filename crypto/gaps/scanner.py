@@ -0,0 +1,103 @@
+import itertools
+from collections import namedtuple
+
+import numpy as np
+
+import archive
+
+# trades further apart than this many seconds are a gap
+DEFAULT_MIN_GAP = 600.0
+CHUNK_SIZE = 1_000_000
+TIME_COLUMN = 2
+
+# a collector was up for the whole gap, so the exchange had no trades
+QUIET = "quiet"
+# no collector covered the gap, trades may be missing
+OUTAGE = "outage"
+
+Gap = namedtuple("Gap", ["start", "end", "kind"])
+
+
+def iter_trade_times(f, chunk_size=CHUNK_SIZE):
+    """ iter_trade_times yields the times of a trades csv stream in arrays of up to chunk_size """
+    while True:
+        lines = list(itertools.islice(f, chunk_size))
+        if not lines:
+            return
+        times = np.empty(len(lines))
+        count = 0
+        for line in lines:
+            try:
+                times[count] = float(line.split(",", TIME_COLUMN + 1)[TIME_COLUMN])
+            except (ValueError, IndexError):
+                # header or truncated line
+                continue
+            count += 1
+        yield times[:count]
+
+
+def find_gaps(times, min_gap=DEFAULT_MIN_GAP):
+    """ find_gaps returns the (start, end) times of consecutive times more than min_gap apart """
+    gaps = np.flatnonzero(np.diff(times) > min_gap)
+    return np.column_stack((times[gaps], times[gaps + 1]))
+
+
+def scan_trades(pair, min_gap=DEFAULT_MIN_GAP, start=None, end=None):
+    """
+    scan_trades returns the (start, end) times of the gaps in pair's trade history
+    in [start, end) as a (gaps, 2) array, reading it chunk by chunk with
+    archive.open_trades, so archived months pruned from _trades.csv are scanned too
+    """
+    found = []
+    with archive.open_trades(pair, start, end) as f:
+        previous = np.empty(0)
+        for times in iter_trade_times(f):
+            # carry the last time over so gaps across chunks are found
+            times = np.concatenate((previous, times))
+            found.append(find_gaps(times, min_gap))
+            previous = times[-1:]
+    return np.concatenate(found) if found else np.empty((0, 2))
+
+
+def _merge_intervals(intervals):
+    """ _merge_intervals returns the starts and ends of the union of (start, end) intervals """
+    intervals = np.asarray(intervals, dtype=np.float64).reshape(-1, 2)
+    if not len(intervals):
+        return intervals[:, 0], intervals[:, 1]
+    intervals = intervals[np.argsort(intervals[:, 0], kind="stable")]
+    starts, ends = intervals[:, 0], intervals[:, 1]
+    reach = np.maximum.accumulate(ends)
+    first = np.flatnonzero(np.concatenate(([True], starts[1:] > reach[:-1])))
+    return starts[first], np.maximum.reduceat(ends, first)
+
+
+def classify_gaps(gaps, uptime):
+    """
+    classify_gaps labels each (start, end) gap QUIET when one of the recorded
+    (start_epoch, end_epoch) uptime intervals, once merged, covers all of it
+    and OUTAGE otherwise
+    """
+    gaps = np.asarray(gaps, dtype=np.float64).reshape(-1, 2)
+    starts, ends = _merge_intervals(uptime)
+    covered = np.zeros(len(gaps), dtype=bool)
+    if len(starts):
+        i = np.searchsorted(starts, gaps[:, 0], side="right") - 1
+        covered = (i >= 0) & (ends[np.maximum(i, 0)] >= gaps[:, 1])
+    return [
+        Gap(start, end, QUIET if quiet else OUTAGE)
+        for (start, end), quiet in zip(gaps.tolist(), covered.tolist())
+    ]
+
+
+def synthetic_windows(path, seconds):
+    """
+    synthetic_windows returns the (start, end) windows without trades behind
+    the runs of synthetic candles of an ohlcv csv of `seconds` candles
+    """
+    data = np.loadtxt(path, delimiter=",", usecols=(0, 6), ndmin=2)
+    flags = np.concatenate(([0], data[:, 1] > 0, [0])).astype(np.int8)
+    edges = np.diff(flags)
+    first = np.flatnonzero(edges == 1)
+    last = np.flatnonzero(edges == -1) - 1
+    # candles are labelled by the end of their interval
+    return np.column_stack((data[first, 0] - seconds, data[last, 0]))
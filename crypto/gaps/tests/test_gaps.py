@@ -0,0 +1,114 @@
+import csv
+
+import numpy as np
+import pytest
+
+import archive
+import gaps
+import kraken
+from collector import StubExchange
+from database import DAO
+from utils import consts, get_data_path
+
+PAIR = "XXBTZUSD"
+START = 1500000000.0
+QUIET_PERIOD = (START + 2000, START + 3000)
+OUTAGE = (START + 5000, START + 6000)
+
+
+def test_find_gaps():
+    times = np.array([1.0, 2.0, 10.0, 11.0, 30.0])
+    assert gaps.find_gaps(times, 5).tolist() == [[2.0, 10.0], [11.0, 30.0]]
+
+
+def test_classify_gaps_merges_uptime():
+    found = [(10, 20), (30, 40), (50, 60)]
+    uptime = [(25, 35), (0, 15), (12, 21), (35, 39)]
+    assert [gap.kind for gap in gaps.classify_gaps(found, uptime)] == [
+        gaps.QUIET,
+        gaps.OUTAGE,
+        gaps.OUTAGE,
+    ]
+    assert [gap.kind for gap in gaps.classify_gaps(found, [])] == [gaps.OUTAGE] * 3
+
+
+def test_synthetic_windows(tmp_path):
+    path = str(tmp_path / "ohlcv.csv")
+    with open(path, "w") as f:
+        for i, synthetic in enumerate([0, 1, 1, 0, 1, 0]):
+            f.write("%d,1,1,1,1,1,%d\n" % (60 * (i + 1), synthetic))
+    assert gaps.synthetic_windows(path, 60).tolist() == [[60, 180], [240, 300]]
+
+
+@pytest.fixture
+def exchange():
+    exchange = StubExchange(
+        pairs=[PAIR],
+        start_epoch=START,
+        trade_interval=10,
+        quiet_periods=[QUIET_PERIOD],
+        clock=lambda: START + 10000,
+    ).start()
+    yield exchange
+    exchange.stop()
+
+
+@pytest.fixture
+def api(exchange):
+    api = kraken.API(max_call_counter=1000)
+    api.uri = exchange.uri
+    yield api
+    api.close()
+
+
+def test_repair_backfills_only_outages(tmp_path, monkeypatch, api, exchange):
+    monkeypatch.setenv("CRYPTO_DATA_DIR", str(tmp_path))
+    complete = gaps.fetch_window(api, PAIR, 0, START + 10000)
+    path = get_data_path(PAIR + consts.TRADES_AFFIX)
+    with open(path, "w") as f:
+        csv.writer(f).writerows(
+            trade for trade in complete if not OUTAGE[0] < trade[2] < OUTAGE[1]
+        )
+
+    dao = DAO(":memory:")
+    dao.create_tables()
+    dao.insert_uptime("trades", PAIR, START, START + 4000)
+
+    found, inserted = gaps.repair_trades(PAIR, api, dao, min_gap=60)
+    assert [(gap.kind, gap.end - gap.start) for gap in found] == [
+        (gaps.QUIET, 1010),
+        (gaps.OUTAGE, 1000),
+    ]
+    assert inserted == 99
+    with open(path, "r", newline="") as f:
+        rows = list(csv.reader(f))
+    assert [float(row[2]) for row in rows] == [trade[2] for trade in complete]
+
+    # the outage is filled and the quiet period is not fetched again
+    calls = exchange.calls["Trades"]
+    found, inserted = gaps.repair_trades(PAIR, api, dao, min_gap=60)
+    assert [gap.kind for gap in found] == [gaps.QUIET]
+    assert inserted == 0
+    assert exchange.calls["Trades"] == calls
+
+
+def test_gaps_in_pruned_history_are_found_but_not_backfilled(tmp_path, monkeypatch):
+    monkeypatch.setenv("CRYPTO_DATA_DIR", str(tmp_path))
+    path = get_data_path(PAIR + consts.TRADES_AFFIX)
+    # a day of trades every minute in January with an hour missing, then one in February
+    times = [
+        t for t in range(1514764800, 1514851200, 60) if not 36000 < t % 86400 < 39600
+    ]
+    with open(path, "w") as f:
+        for t in times + [1517443200]:
+            f.write("100.0,1.0,%d.0,b,l,\n" % t)
+    archive.archive_trades(PAIR, prune=True)
+
+    found = gaps.scan_trades(PAIR, min_gap=600)
+    assert found[0].tolist() == [1514764800 + 36000, 1514764800 + 39600]
+
+    dao = DAO(":memory:")
+    dao.create_tables()
+    found, inserted = gaps.repair_trades(PAIR, object(), dao, min_gap=600)
+    assert [gap.kind for gap in found] == [gaps.OUTAGE] * 2
+    assert inserted == 0
@@ -39,5 +39,7 @@ to the top-level namespace, so the following uses are possible:
 # "public interface"
 from .api import API
 from .api import RateLimitError
+from .cache import ResponseCache
+from .cache import SharedFileCache
 
-__all__ = ["API", "RateLimitError"]
+__all__ = ["API", "RateLimitError", "ResponseCache", "SharedFileCache"]
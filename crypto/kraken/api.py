@@ -18,6 +18,7 @@
 """Kraken.com cryptocurrency Exchange API."""
 
 import requests
+import json
 import threading
 import logging
 import datetime
@@ -36,6 +37,7 @@ from . import version
 
 RATE_LIMIT_EXCEEDED = ["EAPI:Rate limit exceeded"]
 API_RATE_DECREMENT_TIMER = 3
+MAX_CALL_COUNTER = 15
 
 
 class RateLimitError(Exception):
@@ -58,15 +60,26 @@ class API(object):
     .. note::
        No query rate limiting is performed.
 
+    Public queries can be served from a :py:class:`ResponseCache` by
+    passing one as ``cache``. Responses served from the cache do not
+    count towards the rate limit.
+
     """
 
-    def __init__(self, key="", secret=""):
+    def __init__(
+        self, key="", secret="", cache=None, max_call_counter=MAX_CALL_COUNTER
+    ):
         """ Create an object with authentication information.
 
         :param key: (optional) key identifier for queries to the API
         :type key: str
         :param secret: (optional) actual private key used to sign messages
         :type secret: str
+        :param cache: (optional) cache for public query responses
+        :type cache: :py:class:`ResponseCache`
+        :param max_call_counter: (optional) call counter at which
+                                 :py:meth:`at_api_limit` reports the limit
+        :type max_call_counter: int
         :returns: None
 
         """
@@ -85,12 +98,25 @@ class API(object):
             }
         )
         self.response = None
+        self.cache = cache
         self._json_options = {}
         self._call_counter = 0
-        self._max_call_counter = 15
+        self._max_call_counter = max_call_counter
+        self._nonce_lock = threading.Lock()
+        self._last_nonce = 0
         self._decrement_counter()
         return
 
+    @property
+    def secret(self):
+        return self._secret
+
+    @secret.setter
+    def secret(self, value):
+        # the decoded key is computed on the first signed request after a change
+        self._secret = value
+        self._signer = None
+
     def _increment_counter(self, method):
         m = {"Ledgers": 2, "TradesHistory": 2, "AddOrder": 0, "CancelOrder": 0}
         count = 1
@@ -165,6 +191,15 @@ class API(object):
         :returns: :py:meth:`requests.Response.json`-deserialised Python object
         :raises: :py:exc:`requests.HTTPError`: if response status not successful
 
+        """
+        return self._parse(self._request(urlpath, data, headers, timeout))
+
+    def _request(self, urlpath, data, headers=None, timeout=None):
+        """ Perform the HTTP round-trip of a query.
+
+        :returns: raw response body
+        :raises: :py:exc:`requests.HTTPError`: if response status not successful
+
         """
         if data is None:
             data = {}
@@ -180,14 +215,26 @@ class API(object):
         if self.response.status_code not in (200, 201, 202):
             self.response.raise_for_status()
 
-        error = self.response.json()["error"]
+        return self.response.content
+
+    def _parse(self, content):
+        """ Deserialise a response body and check it for API errors.
+
+        :param content: raw response body
+        :type content: bytes
+        :returns: the ``result`` member of the response
+
+        """
+        response = json.loads(content, **self._json_options)
+
+        error = response["error"]
         if error:
             if error == RATE_LIMIT_EXCEEDED:
                 raise RateLimitError(error)
             else:
                 raise RuntimeError(error)
 
-        return self.response.json(**self._json_options)["result"]
+        return response["result"]
 
     def query_public(self, method, data=None, timeout=None):
         """ Performs an API query that does not require a valid key/secret pair.
@@ -208,8 +255,16 @@ class API(object):
 
         urlpath = "/" + self.apiversion + "/public/" + method
 
-        self._increment_counter(method)
-        return self._query(urlpath, data, timeout=timeout)
+        if self.cache is None:
+            self._increment_counter(method)
+            return self._query(urlpath, data, timeout=timeout)
+
+        def fetch():
+            self._increment_counter(method)
+            content = self._request(urlpath, data, timeout=timeout)
+            return content, self._parse(content)
+
+        return self.cache.get_or_fetch(method, data, fetch, self._parse)
 
     def query_private(self, method, data=None, timeout=None):
         """ Performs an API query that requires a valid key/secret pair.
@@ -243,10 +298,31 @@ class API(object):
     def _nonce(self):
         """ Nonce counter.
 
+        Nonces are microseconds since the epoch, bumped past the last nonce
+        handed out so concurrent requests never share one. Only handing them
+        out is serialised: requests sent from several threads can still reach
+        Kraken out of nonce order, which it rejects unless the key has a nonce
+        window, so send a key's private queries from one thread otherwise.
+
         :returns: an always-increasing unsigned integer (up to 64 bits wide)
 
         """
-        return int(1000 * time.time())
+        with self._nonce_lock:
+            nonce = max(time.time_ns() // 1000, self._last_nonce + 1)
+            self._last_nonce = nonce
+        return nonce
+
+    def _get_signer(self):
+        """ HMAC keyed with the decoded secret, copied for each signature.
+
+        :returns: :py:class:`hmac.HMAC` that must not be updated in place
+
+        """
+        signer = self._signer
+        if signer is None:
+            signer = hmac.new(base64.b64decode(self.secret), digestmod=hashlib.sha512)
+            self._signer = signer
+        return signer
 
     def _sign(self, data, urlpath):
         """ Sign request data according to Kraken's scheme.
@@ -263,7 +339,8 @@ class API(object):
         encoded = (str(data["nonce"]) + postdata).encode()
         message = urlpath.encode() + hashlib.sha256(encoded).digest()
 
-        signature = hmac.new(base64.b64decode(self.secret), message, hashlib.sha512)
+        signature = self._get_signer().copy()
+        signature.update(message)
         sigdigest = base64.b64encode(signature.digest())
 
         return sigdigest.decode()
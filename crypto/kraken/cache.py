@@ -0,0 +1,237 @@
+"""Opt-in response cache for public Kraken endpoints.
+
+Responses are kept as the raw JSON bodies returned by Kraken, so the memory
+bound is exact and every caller gets its own freshly decoded object.
+
+.. code-block:: python
+
+   cache = kraken.ResponseCache(shared=kraken.SharedFileCache("/tmp/kraken.db"))
+   k = kraken.API(cache=cache)
+
+"""
+
+import collections
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+# seconds a response stays fresh, endpoints not listed here are never cached
+DEFAULT_TTLS = {
+    "Time": 1.0,
+    "Depth": 1.0,
+    "Ticker": 1.0,
+    "Spread": 5.0,
+    "OHLC": 30.0,
+    "Assets": 3600.0,
+    "AssetPairs": 3600.0,
+}
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class _Call(object):
+    """ An in-flight request that concurrent identical requests wait on. """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.content = None
+        self.error = None
+
+
+class ResponseCache(object):
+    """ LRU cache of public query responses with per-endpoint TTLs.
+
+    Concurrent identical requests are coalesced: the first caller performs
+    the HTTP round-trip and the others wait for its response.
+
+    :param ttls: (optional) endpoint name to time-to-live in seconds,
+                 defaults to :py:data:`DEFAULT_TTLS`
+    :type ttls: dict
+    :param max_bytes: (optional) upper bound on the size of the cached bodies
+    :type max_bytes: int
+    :param shared: (optional) cache shared with co-located processes
+    :type shared: :py:class:`SharedFileCache`
+    :param clock: (optional) monotonic clock, for testing
+    :type clock: callable
+
+    """
+
+    def __init__(self, ttls=None, max_bytes=DEFAULT_MAX_BYTES, shared=None, clock=None):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self._clock = clock or time.monotonic
+        self._entries = collections.OrderedDict()
+        self._inflight = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        return
+
+    @staticmethod
+    def key(method, data):
+        """ Cache key of a query, independent of the parameter order. """
+        return method + "?" + urllib.parse.urlencode(sorted((data or {}).items()))
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """ Total size in bytes of the cached response bodies. """
+        return self._size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        return
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, content = entry
+        if expires <= self._clock():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return content
+
+    def _remove(self, key):
+        _, content = self._entries.pop(key)
+        self._size -= len(content)
+
+    def _put(self, key, content, ttl):
+        if key in self._entries:
+            self._remove(key)
+        if len(content) > self.max_bytes:
+            return
+        self._entries[key] = (self._clock() + ttl, content)
+        self._size += len(content)
+        while self._size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def get_or_fetch(self, method, data, fetch, parse):
+        """ Return a cached response, or perform ``fetch`` at most once per key.
+
+        :param method: API method name
+        :type method: str
+        :param data: API request parameters
+        :type data: dict
+        :param fetch: performs the request, returns the body and its decoded result
+        :type fetch: callable
+        :param parse: decodes a cached body
+        :type parse: callable
+        :returns: decoded result
+
+        """
+        ttl = self.ttls.get(method)
+        if not ttl:
+            return fetch()[1]
+
+        key = self.key(method, data)
+        with self._lock:
+            content = self._get(key)
+            if content is not None:
+                self.hits += 1
+                return parse(content)
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return parse(call.content)
+
+        try:
+            shared = self.shared.get(key) if self.shared is not None else None
+            if shared is not None:
+                # only keep it for what is left of the lifetime it was shared with
+                content, expires = shared
+                ttl = expires - time.time()
+                result = parse(content)
+            else:
+                content, result = fetch()
+                if self.shared is not None:
+                    self.shared.put(key, content, ttl)
+            with self._lock:
+                self._put(key, content, ttl)
+            call.content = content
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.event.set()
+
+
+class SharedFileCache(object):
+    """ Response cache stored in a local sqlite file.
+
+    Lets collector processes on the same machine reuse each other's
+    responses. Expiry uses wall clock time since it is shared between
+    processes.
+
+    :param path: path to the cache file, created if missing
+    :type path: str
+
+    """
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache"
+            " (key TEXT PRIMARY KEY, expires REAL NOT NULL, content BLOB NOT NULL)"
+        )
+        conn.commit()
+        return
+
+    def _connection(self):
+        # sqlite connections cannot be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=self.timeout)
+        return conn
+
+    def get(self, key):
+        """ Return the ``(content, expires)`` of an unexpired entry, or ``None``.
+
+        :param key: cache key, see :py:meth:`ResponseCache.key`
+        :type key: str
+        :returns: body and wall clock expiry time
+
+        """
+        row = (
+            self._connection()
+            .execute(
+                "SELECT content, expires FROM response_cache WHERE key = ? AND expires > ?",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+        return (bytes(row[0]), row[1]) if row else None
+
+    def put(self, key, content, ttl):
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO response_cache (key, expires, content) VALUES (?, ?, ?)",
+            (key, now + ttl, content),
+        )
+        conn.execute("DELETE FROM response_cache WHERE expires <= ?", (now,))
+        conn.commit()
+        return
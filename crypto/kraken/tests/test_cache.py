@@ -0,0 +1,168 @@
+import json
+import threading
+
+import pytest
+
+import kraken
+from kraken import ResponseCache, SharedFileCache
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeResponse(object):
+    status_code = 200
+
+    def __init__(self, result):
+        self.content = json.dumps({"error": [], "result": result}).encode()
+
+
+class FakeSession(object):
+    """ Counts the round-trips an API object performs """
+
+    def __init__(self, delay=None):
+        self.calls = []
+        self.delay = delay
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        self.calls.append((url, dict(data)))
+        if self.delay is not None:
+            self.delay.wait()
+        return FakeResponse({"url": url, "data": data, "n": len(self.calls)})
+
+    def close(self):
+        pass
+
+
+def fetcher(content):
+    calls = []
+
+    def fetch():
+        calls.append(content)
+        return content, json.loads(content)
+
+    return fetch, calls
+
+
+@pytest.fixture
+def api():
+    api = kraken.API(cache=ResponseCache())
+    api.session = FakeSession()
+    return api
+
+
+def test_hit_within_ttl_and_expiry():
+    clock = FakeClock()
+    cache = ResponseCache(ttls={"Time": 1.0}, clock=clock)
+    fetch, calls = fetcher(b'{"unixtime": 1}')
+
+    assert cache.get_or_fetch("Time", {}, fetch, json.loads) == {"unixtime": 1}
+    assert cache.get_or_fetch("Time", {}, fetch, json.loads) == {"unixtime": 1}
+    assert len(calls) == 1
+
+    clock.now = 1.5
+    cache.get_or_fetch("Time", {}, fetch, json.loads)
+    assert len(calls) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_uncached_endpoint_always_fetches():
+    cache = ResponseCache(ttls={"Time": 1.0})
+    fetch, calls = fetcher(b"[]")
+    for _ in range(3):
+        cache.get_or_fetch("Trades", {"since": 0}, fetch, json.loads)
+    assert len(calls) == 3
+    assert len(cache) == 0
+
+
+def test_key_ignores_parameter_order():
+    assert ResponseCache.key("Depth", {"pair": "X", "count": 5}) == ResponseCache.key(
+        "Depth", {"count": 5, "pair": "X"}
+    )
+
+
+def test_lru_eviction_is_bounded_by_bytes():
+    cache = ResponseCache(ttls={"Depth": 60.0}, max_bytes=20)
+    for pair in ("A", "B", "C"):
+        fetch, _ = fetcher(b'"0123456789"')  # 12 bytes
+        cache.get_or_fetch("Depth", {"pair": pair}, fetch, json.loads)
+    assert len(cache) == 1
+    assert cache.size == 12
+
+    fetch, calls = fetcher(b'"0123456789"')
+    cache.get_or_fetch("Depth", {"pair": "C"}, fetch, json.loads)
+    cache.get_or_fetch("Depth", {"pair": "A"}, fetch, json.loads)
+    assert len(calls) == 1
+
+
+def test_errors_are_not_cached():
+    cache = ResponseCache(ttls={"Time": 60.0})
+
+    def failing():
+        raise kraken.RateLimitError(["EAPI:Rate limit exceeded"])
+
+    with pytest.raises(kraken.RateLimitError):
+        cache.get_or_fetch("Time", {}, failing, json.loads)
+    fetch, calls = fetcher(b"1")
+    assert cache.get_or_fetch("Time", {}, fetch, json.loads) == 1
+    assert len(calls) == 1
+
+
+def test_concurrent_requests_are_coalesced(api):
+    release = threading.Event()
+    api.session = FakeSession(delay=release)
+    results = []
+
+    def query():
+        results.append(api.query_public("Depth", data={"pair": "XXBTZUSD"}))
+
+    threads = [threading.Thread(target=query) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while api.cache.coalesced + api.cache.misses < len(threads):
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(api.session.calls) == 1
+    assert len(results) == 8
+    assert all(result == results[0] for result in results)
+
+
+def test_api_cache_skips_rate_limit_counter(api):
+    api.query_public("Time")
+    counter = api._call_counter
+    api.query_public("Time")
+    assert api._call_counter == counter
+    assert len(api.session.calls) == 1
+
+
+def test_shared_file_cache_between_processes(tmp_path):
+    path = str(tmp_path / "shared.db")
+    first = ResponseCache(ttls={"AssetPairs": 60.0}, shared=SharedFileCache(path))
+    second = ResponseCache(ttls={"AssetPairs": 60.0}, shared=SharedFileCache(path))
+
+    fetch, calls = fetcher(b'{"XXBTZUSD": {}}')
+    first.get_or_fetch("AssetPairs", {}, fetch, json.loads)
+    assert second.get_or_fetch("AssetPairs", {}, fetch, json.loads) == {"XXBTZUSD": {}}
+    assert len(calls) == 1
+
+
+def test_shared_entries_keep_their_remaining_lifetime(tmp_path):
+    shared = SharedFileCache(str(tmp_path / "shared.db"))
+    key = ResponseCache.key("Depth", {})
+    shared.put(key, b'{"n": 1}', 1.0)
+    cache = ResponseCache(ttls={"Depth": 60.0}, shared=shared, clock=FakeClock())
+
+    fetch, calls = fetcher(b'{"n": 2}')
+    assert cache.get_or_fetch("Depth", {}, fetch, json.loads) == {"n": 1}
+    assert not calls
+    # the shared entry had at most a second left, not the full ttl of 60
+    expires, _ = cache._entries[key]
+    assert 0.0 < expires <= 1.0
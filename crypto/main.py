@@ -1,54 +1,242 @@
-from __future__ import (absolute_import, division, print_function,
-                        unicode_literals)
+from __future__ import absolute_import, division, print_function, unicode_literals
 
+import argparse
+import logging
+import time
 from datetime import datetime
 
-import backtrader as bt
-
-from backtest.feeds.kraken_csv_feed import KrakenCSVData
-from backtest.strategies.test_strategy import TestStrategy
 from utils import consts, get_data_path, pairs
 
+# backtrader, the strategies and plotting are imported when they are needed,
+# so the cached path and --help do not pay for them
 
-def test_backtrader():
-    cerebro = bt.Cerebro()
 
-    # starting cash
-    cerebro.broker.set_cash(100000)
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Backtest a strategy on kraken candles"
+    )
+    parser.add_argument("--pair", default=pairs.PAIR_XBT_USD)
+    parser.add_argument(
+        "--pairs",
+        nargs="+",
+        help="backtest a portfolio of these pairs, or of every pair with 'all', "
+        "instead of a single pair with backtrader",
+    )
+    parser.add_argument(
+        "--source-timeframe",
+        default="M1",
+        help="timeframe of the ohlcv file to read, as written by resample_trade_data",
+    )
+    parser.add_argument(
+        "--compression",
+        type=int,
+        default=60,
+        help="minutes per bar fed to the strategy",
+    )
+    parser.add_argument("--fromdate", type=parse_date, default=datetime(2018, 1, 1))
+    parser.add_argument("--todate", type=parse_date)
+    parser.add_argument("--cash", type=float, default=100000)
+    parser.add_argument("--commission", type=float, default=0.001)
+    parser.add_argument("--percents", type=float, default=10)
+    parser.add_argument("--maperiod", type=int, default=15)
+    parser.add_argument(
+        "--walk-forward",
+        nargs=2,
+        type=float,
+        metavar=("TRAIN_DAYS", "TEST_DAYS"),
+        help="run walk-forward windows of the pair instead of one backtest",
+    )
+    parser.add_argument(
+        "--step-days", type=float, help="days between walk-forward windows"
+    )
+    parser.add_argument(
+        "--maperiods",
+        nargs="+",
+        type=int,
+        help="maperiods to pick from on each walk-forward train window",
+    )
+    parser.add_argument(
+        "--processes", type=int, help="processes running walk-forward windows"
+    )
+    parser.add_argument("--quiet", action="store_true", help="only log the final value")
+    parser.add_argument("--plot", action="store_true")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="always parse and resample the csv"
+    )
+    return parser.parse_args(argv)
 
-    # add strategy
-    cerebro.addstrategy(TestStrategy)
 
-    # add datas
-    datapath = get_data_path(pairs.PAIR_XBT_USD + "_M1" + consts.OHLCV_AFFIX)
-    data = KrakenCSVData(
-        dataname=datapath,
-        fromdate=datetime(2018, 1, 1),
-        timeframe=bt.TimeFrame.Minutes,
-        compression=1,
+def test_backtrader(args):
+    started = time.perf_counter()
+
+    from backtest.feeds.prepared import prepare_candles, to_epoch
+
+    # prepared datas
+    datapath = get_data_path(
+        args.pair + "_" + args.source_timeframe + consts.OHLCV_AFFIX
+    )
+    candles = prepare_candles(
+        datapath,
+        seconds=args.compression * 60,
+        start=to_epoch(args.fromdate),
+        end=to_epoch(args.todate),
+        use_cache=not args.no_cache,
     )
+    prepared = time.perf_counter()
+
+    import backtrader as bt
+
+    from backtest.feeds.array_feed import ArrayData
+    from backtest.strategies.test_strategy import TestStrategy
 
-    # plain add
-    # cerebro.adddata(data)
+    cerebro = bt.Cerebro()
+
+    # starting cash
+    cerebro.broker.set_cash(args.cash)
 
-    # resampling
-    cerebro.resampledata(data, timeframe=bt.TimeFrame.Minutes, compression=60)
+    # add strategy
+    cerebro.addstrategy(TestStrategy, maperiod=args.maperiod, printlog=not args.quiet)
+
+    # add datas, already resampled to the requested compression
+    cerebro.adddata(
+        ArrayData(
+            candles=candles,
+            name=args.pair,
+            timeframe=bt.TimeFrame.Minutes,
+            compression=args.compression,
+        )
+    )
 
     # sizer
     # TODO: figure out fractional sizing/commisions for crypto
-    cerebro.addsizer(bt.sizers.PercentSizer, percents=10)
+    cerebro.addsizer(bt.sizers.PercentSizer, percents=args.percents)
 
     # commision
-    cerebro.broker.setcommission(commission=0.001)
+    cerebro.broker.setcommission(commission=args.commission)
 
     print(f"Starting portfolio val: {cerebro.broker.getvalue():.2f}")
 
+    ready = time.perf_counter()
     cerebro.run()
+    finished = time.perf_counter()
 
     print(f"Ending portfolio val: {cerebro.broker.getvalue():.2f}")
+    logging.info(
+        "Prepared %d bars in %.3fs, strategy started after %.3fs, ran for %.3fs",
+        len(candles),
+        prepared - started,
+        ready - started,
+        finished - ready,
+    )
+
+    if args.plot:
+        # pulls in matplotlib
+        cerebro.plot(style="bar")
+
+
+def test_portfolio(args):
+    started = time.perf_counter()
+
+    from backtest import portfolio
+    from backtest.feeds.prepared import to_epoch
 
-    cerebro.plot(style="bar")
+    # TestStrategy's rule for every pair at once: a pair is bought with percents of the
+    # portfolio when its close rises above its sma and sold when it falls back below,
+    # held pairs are only resized when more than 100 / percents pairs are long together
+    matrix = portfolio.load_matrix(
+        pairs.ALL_PAIRS if args.pairs == ["all"] else args.pairs,
+        source_timeframe=args.source_timeframe,
+        seconds=args.compression * 60,
+        start=to_epoch(args.fromdate),
+        end=to_epoch(args.todate),
+        use_cache=not args.no_cache,
+    )
+    prepared = time.perf_counter()
+    signals = portfolio.sma_crossover(matrix, fast=1, slow=args.maperiod)
+    weights = portfolio.equal_weights(signals, max_weight=args.percents / 100)
+    result = portfolio.simulate(matrix, weights, args.cash, args.commission)
+    finished = time.perf_counter()
+
+    print(f"Starting portfolio val: {args.cash:.2f}")
+    if not args.quiet:
+        for pair, units, close in zip(matrix.pairs, result.holdings, matrix.close[-1]):
+            print(f"{pair}: {units:.8f} units, {units * close:.2f} value")
+    print(f"Ending portfolio val: {result.equity[-1]:.2f}")
+    logging.info(
+        "Aligned %d bars of %d pairs in %.3fs, simulated %d trades in %.3fs",
+        len(matrix),
+        len(matrix.pairs),
+        prepared - started,
+        result.trades,
+        finished - prepared,
+    )
+
+
+def test_walk_forward(args):
+    started = time.perf_counter()
+
+    from backtest import walkforward
+    from backtest.feeds.prepared import prepare_candles, to_epoch
+    from backtest.strategies.test_strategy import TestStrategy
+
+    # one preloaded array, every window is a slice of it
+    candles = prepare_candles(
+        get_data_path(args.pair + "_" + args.source_timeframe + consts.OHLCV_AFFIX),
+        seconds=args.compression * 60,
+        start=to_epoch(args.fromdate),
+        end=to_epoch(args.todate),
+        use_cache=not args.no_cache,
+    )
+    train_days, test_days = args.walk_forward
+    windows = walkforward.walk_forward_windows(
+        candles["datetime"],
+        train=train_days * 86400,
+        test=test_days * 86400,
+        step=args.step_days * 86400 if args.step_days else None,
+    )
+    runner = walkforward.WindowRunner(
+        candles,
+        cash=args.cash,
+        commission=args.commission,
+        percents=args.percents,
+        compression=args.compression,
+        processes=args.processes,
+        use_cache=not args.no_cache,
+    )
+    grid = [
+        {"maperiod": maperiod, "printlog": False}
+        for maperiod in args.maperiods or [args.maperiod]
+    ]
+    # every window starts with enough candles before it for the longest sma
+    warmup = max(params["maperiod"] for params in grid)
+    results = walkforward.walk_forward(runner, TestStrategy, grid, windows, warmup)
+    finished = time.perf_counter()
+
+    for result in results:
+        test_start = datetime.utcfromtimestamp(candles["datetime"][result.window.split])
+        print(
+            f"{test_start:%Y-%m-%d %H:%M} maperiod {result.params['maperiod']}: "
+            f"{100 * (result.end_value / result.start_value - 1):+.2f}%"
+        )
+    logging.info(
+        "Ran %d windows in %.3fs, %d backtests computed, %d cached",
+        len(results),
+        finished - started,
+        runner.misses,
+        runner.hits,
+    )
 
 
 if __name__ == "__main__":
-    test_backtrader()
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    if args.pairs:
+        test_portfolio(args)
+    elif args.walk_forward:
+        test_walk_forward(args)
+    else:
+        test_backtrader(args)
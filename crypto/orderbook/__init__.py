@@ -0,0 +1,8 @@
+"""
+Orderbook snapshot representation shared by storage, exporters and analytics
+"""
+
+from .snapshot import OrderbookSnapshot, LEVEL_DTYPE
+from .export import export_csv, export_npz, load_npz
+
+__all__ = ["OrderbookSnapshot", "LEVEL_DTYPE", "export_csv", "export_npz", "load_npz"]
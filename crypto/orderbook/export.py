@@ -0,0 +1,60 @@
+import csv
+
+import numpy as np
+
+from .snapshot import OrderbookSnapshot, LEVEL_DTYPE
+
+
+def export_csv(snapshots, path):
+    """ export_csv writes snapshots in the raw_orderbook column layout """
+    with open(path, "w") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["pair", "price", "volume", "is_ask", "order_epoch", "snapshot_epoch"]
+        )
+        for snapshot in snapshots:
+            writer.writerows(snapshot.rows())
+
+
+def export_npz(snapshots, path):
+    """
+    export_npz writes snapshots of a single pair as one concatenated levels array
+    plus the per snapshot epochs, ask counts and level offsets
+    """
+    snapshots = list(snapshots)
+    pairs = {snapshot.pair for snapshot in snapshots}
+    if len(pairs) > 1:
+        raise ValueError(f"export_npz expects a single pair, got {sorted(pairs)}")
+
+    counts = np.array([len(snapshot) for snapshot in snapshots], dtype=np.int64)
+    offsets = np.zeros(len(snapshots) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    levels = (
+        np.concatenate([snapshot.levels for snapshot in snapshots])
+        if snapshots
+        else np.empty(0, dtype=LEVEL_DTYPE)
+    )
+    np.savez_compressed(
+        path,
+        pair=np.array(pairs.pop() if pairs else ""),
+        snapshot_epoch=np.array(
+            [s.snapshot_epoch for s in snapshots], dtype=np.float64
+        ),
+        ask_count=np.array([s.ask_count for s in snapshots], dtype=np.int64),
+        offsets=offsets,
+        levels=levels,
+    )
+
+
+def load_npz(path):
+    """ load_npz yields the snapshots written by export_npz """
+    with np.load(path) as data:
+        pair = str(data["pair"])
+        offsets = data["offsets"]
+        levels = data["levels"]
+        for i, (epoch, ask_count) in enumerate(
+            zip(data["snapshot_epoch"].tolist(), data["ask_count"].tolist())
+        ):
+            yield OrderbookSnapshot(
+                pair, epoch, ask_count, levels[offsets[i] : offsets[i + 1]]
+            )
@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+
+# one row per price level, asks first (ascending price) then bids (descending price)
+LEVEL_DTYPE = np.dtype([("price", "<f8"), ("volume", "<f8"), ("order_epoch", "<i8")])
+
+
+class OrderbookSnapshot(object):
+    """
+    OrderbookSnapshot holds every level of a single Depth response in one structured array
+    The pair and snapshot epoch are stored once per snapshot instead of once per level
+    """
+
+    __slots__ = ("pair", "snapshot_epoch", "ask_count", "levels")
+
+    def __init__(self, pair, snapshot_epoch, ask_count, levels):
+        self.pair = pair
+        self.snapshot_epoch = snapshot_epoch
+        self.ask_count = ask_count
+        self.levels = levels
+
+    @classmethod
+    def from_depth(cls, pair, res, snapshot_epoch=None):
+        """
+        from_depth converts a Kraken Depth result for a single pair
+        {"asks": [[price, volume, timestamp], ...], "bids": [...]}
+        The level lists are transposed once and each column is parsed by numpy
+        """
+        if snapshot_epoch is None:
+            snapshot_epoch = time.time()
+        asks = res["asks"]
+        raw = asks + res["bids"]
+        levels = np.empty(len(raw), dtype=LEVEL_DTYPE)
+        if raw:
+            prices, volumes, order_epochs = zip(*raw)
+            levels["price"] = np.array(prices, dtype=np.float64)
+            levels["volume"] = np.array(volumes, dtype=np.float64)
+            levels["order_epoch"] = np.array(order_epochs, dtype=np.int64)
+        return cls(pair, snapshot_epoch, len(asks), levels)
+
+    @classmethod
+    def from_bytes(cls, pair, snapshot_epoch, ask_count, blob):
+        """ from_bytes wraps a stored levels blob without copying it """
+        return cls(
+            pair, snapshot_epoch, ask_count, np.frombuffer(blob, dtype=LEVEL_DTYPE)
+        )
+
+    def to_bytes(self):
+        return self.levels.tobytes()
+
+    @property
+    def asks(self):
+        return self.levels[: self.ask_count]
+
+    @property
+    def bids(self):
+        return self.levels[self.ask_count :]
+
+    @property
+    def is_ask(self):
+        is_ask = np.zeros(len(self.levels), dtype=bool)
+        is_ask[: self.ask_count] = True
+        return is_ask
+
+    def rows(self):
+        """ rows yields the snapshot in the row layout of the raw_orderbook table """
+        is_ask = self.is_ask.tolist()
+        for price, volume, order_epoch, ask in zip(
+            self.levels["price"].tolist(),
+            self.levels["volume"].tolist(),
+            self.levels["order_epoch"].tolist(),
+            is_ask,
+        ):
+            yield (self.pair, price, volume, ask, order_epoch, self.snapshot_epoch)
+
+    def __len__(self):
+        return len(self.levels)
+
+    def __repr__(self):
+        return "OrderbookSnapshot(pair=%s, snapshot_epoch=%f, asks=%d, bids=%d)" % (
+            self.pair,
+            self.snapshot_epoch,
+            self.ask_count,
+            len(self.levels) - self.ask_count,
+        )
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from database import DAO
+from orderbook import OrderbookSnapshot, export_npz, load_npz
+
+PAIR = "XXBTZUSD"
+DEPTH = {
+    "asks": [["7001.50000", "1.250", 1585000001], ["7002.00000", "0.500", 1585000002]],
+    "bids": [["7000.00000", "2.000", 1585000003], ["6999.10000", "3.000", 1585000004]],
+}
+
+
+@pytest.fixture
+def dao():
+    dao = DAO(":memory:")
+    dao.create_tables()
+    yield dao
+    dao.close()
+
+
+def test_from_depth():
+    snapshot = OrderbookSnapshot.from_depth(PAIR, DEPTH, 1585000010.5)
+    assert len(snapshot) == 4
+    assert snapshot.ask_count == 2
+    np.testing.assert_array_equal(snapshot.asks["price"], [7001.5, 7002.0])
+    np.testing.assert_array_equal(snapshot.bids["volume"], [2.0, 3.0])
+    assert snapshot.bids["order_epoch"].tolist() == [1585000003, 1585000004]
+
+
+def test_from_depth_empty_book():
+    snapshot = OrderbookSnapshot.from_depth(PAIR, {"asks": [], "bids": []}, 1.0)
+    assert len(snapshot) == 0
+    assert list(snapshot.rows()) == []
+
+
+def test_rows_match_raw_orderbook_layout():
+    rows = list(OrderbookSnapshot.from_depth(PAIR, DEPTH, 10.0).rows())
+    assert rows[0] == (PAIR, 7001.5, 1.25, True, 1585000001, 10.0)
+    assert rows[-1] == (PAIR, 6999.1, 3.0, False, 1585000004, 10.0)
+
+
+def test_dao_round_trip(dao):
+    snapshots = [
+        OrderbookSnapshot.from_depth(PAIR, DEPTH, epoch) for epoch in (1.0, 2.0, 3.0)
+    ]
+    dao.bulk_insert_orderbook_snapshots(snapshots)
+
+    stored = list(dao.iter_orderbook_snapshots(PAIR, start=2.0))
+    assert [s.snapshot_epoch for s in stored] == [2.0, 3.0]
+    assert stored[0].ask_count == 2
+    np.testing.assert_array_equal(stored[0].levels, snapshots[1].levels)
+
+
+def test_npz_round_trip(tmp_path):
+    snapshots = [
+        OrderbookSnapshot.from_depth(PAIR, DEPTH, epoch) for epoch in (1.0, 2.0)
+    ]
+    path = str(tmp_path / "snapshots.npz")
+    export_npz(snapshots, path)
+
+    loaded = list(load_npz(path))
+    assert [s.snapshot_epoch for s in loaded] == [1.0, 2.0]
+    np.testing.assert_array_equal(loaded[1].levels, snapshots[1].levels)
+
+
+def test_raw_orderbook_history_is_read_as_snapshots(dao):
+    first = OrderbookSnapshot.from_depth(PAIR, DEPTH, 1585000010.5)
+    second = OrderbookSnapshot.from_depth(PAIR, DEPTH, 1585000013.5)
+    dao.bulk_insert_raw_orderbook(second)
+    dao.bulk_insert_raw_orderbook(first)
+
+    snapshots = list(dao.iter_raw_orderbook_snapshots(PAIR))
+    assert [s.snapshot_epoch for s in snapshots] == [1585000010.5, 1585000013.5]
+    assert snapshots[0].ask_count == 2
+    np.testing.assert_array_equal(snapshots[0].levels, first.levels)
+
+    assert dao.migrate_raw_orderbook() == 2
+    assert dao.migrate_raw_orderbook() == 0
+    migrated = list(dao.iter_orderbook_snapshots(PAIR))
+    np.testing.assert_array_equal(migrated[1].levels, second.levels)
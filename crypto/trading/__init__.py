@@ -0,0 +1,28 @@
+"""
+Order management with a paper trading mode that fills against orderbook snapshots
+and a real mode that places orders through kraken.API
+"""
+
+from .orders import Order, Fill, OrderError, BUY, SELL, MARKET, LIMIT
+from .orders import PENDING, OPEN, CLOSED, CANCELED, REJECTED
+from .paper import PaperExecutor
+from .live import KrakenExecutor
+from .manager import OrderManager
+
+__all__ = [
+    "Order",
+    "Fill",
+    "OrderError",
+    "BUY",
+    "SELL",
+    "MARKET",
+    "LIMIT",
+    "PENDING",
+    "OPEN",
+    "CLOSED",
+    "CANCELED",
+    "REJECTED",
+    "PaperExecutor",
+    "KrakenExecutor",
+    "OrderManager",
+]
@@ -0,0 +1,105 @@
+import logging
+import time
+
+from .orders import PENDING, OPEN, CLOSED, CANCELED, LIMIT, VOLUME_EPSILON
+
+# decimals used when AssetPairs does not give a pair's precision
+DEFAULT_DECIMALS = 8
+# most txids QueryOrders takes at once
+QUERY_ORDERS_BATCH = 50
+# Kraken's order statuses, expired orders are canceled by the exchange
+STATUSES = {
+    "pending": PENDING,
+    "open": OPEN,
+    "closed": CLOSED,
+    "canceled": CANCELED,
+    "expired": CANCELED,
+}
+
+
+class KrakenExecutor(object):
+    """
+    KrakenExecutor places orders on Kraken through a kraken.API with a key loaded
+    With validate=True Kraken only checks the orders, nothing is placed
+    Prices and volumes are rounded to the precision AssetPairs gives for the pair,
+    looked up once per pair
+    Placed orders stay open until refresh reads their fills and status back
+    """
+
+    def __init__(self, api, validate=False):
+        self.api = api
+        self.validate = validate
+        self._decimals = {}
+
+    def decimals(self, pair):
+        """ decimals returns the (price, volume) decimals Kraken accepts for pair """
+        if pair not in self._decimals:
+            res = self.api.query_public("AssetPairs", {"pair": pair})
+            # the result is keyed by Kraken's name for the pair, which may differ
+            info = res[pair] if pair in res else next(iter(res.values()))
+            self._decimals[pair] = (
+                info.get("pair_decimals", DEFAULT_DECIMALS),
+                info.get("lot_decimals", DEFAULT_DECIMALS),
+            )
+        return self._decimals[pair]
+
+    def submit(self, order):
+        price_decimals, volume_decimals = self.decimals(order.pair)
+        data = {
+            "pair": order.pair,
+            "type": order.side,
+            "ordertype": order.order_type,
+            "volume": "%.*f" % (volume_decimals, order.volume),
+        }
+        if order.order_type == LIMIT:
+            data["price"] = "%.*f" % (price_decimals, order.price)
+        if self.validate:
+            data["validate"] = "true"
+        res = self.api.query_private("AddOrder", data)
+        txids = res.get("txid")
+        order.txid = txids[0] if txids else None
+        order.status = CLOSED if self.validate else OPEN
+        logging.info("Placed order %s: %s", order.txid, res.get("descr"))
+        return order
+
+    def cancel(self, order):
+        self.api.query_private("CancelOrder", {"txid": order.txid})
+        order.status = CANCELED
+        return order
+
+    def refresh(self, orders):
+        """
+        refresh updates the fills, fees and status of placed orders from QueryOrders
+        The volume executed since the last refresh is added as one fill at its
+        average price, returns the orders that changed
+        """
+        orders = [order for order in orders if order.txid is not None]
+        changed = []
+        for i in range(0, len(orders), QUERY_ORDERS_BATCH):
+            batch = orders[i : i + QUERY_ORDERS_BATCH]
+            res = self.api.query_private(
+                "QueryOrders", {"txid": ",".join(order.txid for order in batch)}
+            )
+            for order in batch:
+                info = res.get(order.txid)
+                if info is not None and self._update(order, info):
+                    changed.append(order)
+        return changed
+
+    @staticmethod
+    def _update(order, info):
+        filled = float(info["vol_exec"])
+        volume = filled - order.filled
+        status = STATUSES.get(info["status"], order.status)
+        if volume <= VOLUME_EPSILON and status == order.status:
+            return False
+        if volume > VOLUME_EPSILON:
+            cost = float(info["cost"]) - order.cost
+            fee = float(info["fee"]) - order.fee
+            epoch = float(info.get("closetm") or time.time())
+            order.add_fill(cost / volume, volume, fee, epoch)
+        order.status = status
+        if info.get("reason"):
+            order.reason = info["reason"]
+        logging.info("Refreshed order %s", order)
+        return True
@@ -0,0 +1,61 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+from .orders import Order, MARKET, REJECTED
+
+
+class OrderManager(object):
+    """
+    OrderManager creates orders for a strategy's signals, sends them through an executor
+    (PaperExecutor or KrakenExecutor) and records the signal to order latency of each
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.orders = []
+        self._latencies_ns = []
+        self._lock = threading.Lock()
+
+    def submit(self, pair, side, volume, order_type=MARKET, price=None, signal_ns=None):
+        """
+        submit sends an order and returns it once the executor accepted or rejected it
+        signal_ns is the time.perf_counter_ns at which the signal was produced,
+        now if it is not given
+        """
+        order = Order(pair, side, volume, order_type, price, signal_ns)
+        order.sent_ns = time.perf_counter_ns()
+        try:
+            self.executor.submit(order)
+        except Exception as e:
+            order.status = REJECTED
+            order.reason = str(e)
+            raise
+        finally:
+            order.acked_ns = time.perf_counter_ns()
+            with self._lock:
+                self.orders.append(order)
+                self._latencies_ns.append(order.latency_ns)
+        if order.status == REJECTED:
+            logging.warning("Order rejected: %s (%s)", order, order.reason)
+        return order
+
+    def cancel(self, order):
+        return self.executor.cancel(order)
+
+    def latency_stats(self):
+        """ latency_stats summarises the signal to order latencies in microseconds """
+        with self._lock:
+            latencies = np.array(self._latencies_ns, dtype=np.float64) / 1000
+        if not len(latencies):
+            return {"count": 0}
+        p50, p99 = np.percentile(latencies, [50, 99])
+        return {
+            "count": len(latencies),
+            "mean_us": float(latencies.mean()),
+            "p50_us": float(p50),
+            "p99_us": float(p99),
+            "max_us": float(latencies.max()),
+        }
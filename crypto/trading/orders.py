@@ -0,0 +1,112 @@
+import time
+from collections import namedtuple
+
+# sides and order types, as named by Kraken's AddOrder
+BUY = "buy"
+SELL = "sell"
+MARKET = "market"
+LIMIT = "limit"
+
+# order statuses, as named by Kraken's QueryOrders, plus rejected
+PENDING = "pending"
+OPEN = "open"
+CLOSED = "closed"
+CANCELED = "canceled"
+REJECTED = "rejected"
+
+# volumes closer than this are considered equal
+VOLUME_EPSILON = 1e-9
+
+Fill = namedtuple("Fill", ["price", "volume", "fee", "epoch"])
+
+
+class OrderError(Exception):
+    pass
+
+
+class Order(object):
+    """
+    Order tracks a single order from the signal that produced it to its last fill
+    Timestamps are time.perf_counter_ns values, so they can only be compared
+    with each other within one process
+    """
+
+    __slots__ = (
+        "pair",
+        "side",
+        "volume",
+        "order_type",
+        "price",
+        "txid",
+        "status",
+        "reason",
+        "filled",
+        "cost",
+        "fee",
+        "fills",
+        "signal_ns",
+        "sent_ns",
+        "acked_ns",
+    )
+
+    def __init__(
+        self, pair, side, volume, order_type=MARKET, price=None, signal_ns=None
+    ):
+        if side not in (BUY, SELL):
+            raise OrderError("unknown side %r" % side)
+        if order_type not in (MARKET, LIMIT):
+            raise OrderError("unknown order type %r" % order_type)
+        if order_type == LIMIT and price is None:
+            raise OrderError("limit orders need a price")
+        if volume <= 0:
+            raise OrderError("volume must be positive")
+        self.pair = pair
+        self.side = side
+        self.volume = float(volume)
+        self.order_type = order_type
+        self.price = None if price is None else float(price)
+        self.txid = None
+        self.status = PENDING
+        self.reason = None
+        self.filled = 0.0
+        self.cost = 0.0
+        self.fee = 0.0
+        self.fills = []
+        self.signal_ns = time.perf_counter_ns() if signal_ns is None else signal_ns
+        self.sent_ns = None
+        self.acked_ns = None
+
+    @property
+    def remaining(self):
+        return self.volume - self.filled
+
+    @property
+    def is_filled(self):
+        return self.remaining <= VOLUME_EPSILON
+
+    @property
+    def average_price(self):
+        return self.cost / self.filled if self.filled else None
+
+    @property
+    def latency_ns(self):
+        """ latency_ns is the time from the signal to the exchange accepting the order """
+        return None if self.acked_ns is None else self.acked_ns - self.signal_ns
+
+    def add_fill(self, price, volume, fee, epoch):
+        self.fills.append(Fill(price, volume, fee, epoch))
+        self.filled += volume
+        self.cost += price * volume
+        self.fee += fee
+
+    def __repr__(self):
+        return "Order(txid=%s, %s %s %.8f %s @ %s, status=%s, filled=%.8f)" % (
+            self.txid,
+            self.side,
+            self.order_type,
+            self.volume,
+            self.pair,
+            self.price,
+            self.status,
+            self.filled,
+        )
@@ -0,0 +1,193 @@
+import itertools
+import logging
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from orderbook import OrderbookSnapshot
+from .orders import BUY, SELL, MARKET, OPEN, CLOSED, CANCELED, REJECTED
+from .orders import OrderError, VOLUME_EPSILON
+
+# Kraken's base taker fee
+DEFAULT_FEE = 0.0026
+
+
+class _Book(object):
+    """
+    _Book is a snapshot with the volume paper orders have left at each level
+    Bid prices are negated so both sides ascend from the best price
+    """
+
+    __slots__ = ("snapshot", "prices", "volumes")
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.prices = {BUY: snapshot.asks["price"], SELL: -snapshot.bids["price"]}
+        self.volumes = {
+            BUY: snapshot.asks["volume"].copy(),
+            SELL: snapshot.bids["volume"].copy(),
+        }
+
+    def quote(self, side, volume, limit=None):
+        """
+        quote returns the volume side would take from each level, best first,
+        and the total volume and cost of taking it, without taking it
+        """
+        prices = self.prices[side]
+        sign = 1.0 if side == BUY else -1.0
+        n = len(prices)
+        if limit is not None:
+            n = np.searchsorted(prices, sign * limit, side="right")
+        available = self.volumes[side][:n]
+        before = np.cumsum(available) - available
+        take = np.clip(volume - before, 0.0, available)
+        return take, float(take.sum()), sign * float(np.dot(take, prices[:n]))
+
+    def consume(self, side, take):
+        self.volumes[side][: len(take)] -= take
+
+
+class PaperExecutor(object):
+    """
+    PaperExecutor fills orders against orderbook snapshots instead of sending them
+    Orders take liquidity from the latest snapshot of their pair and what a limit
+    order leaves rests until a later snapshot crosses it. Liquidity taken is gone
+    until the next snapshot of the pair replaces the book.
+    Funds for resting orders are held like on the exchange, so cash and positions
+    are what is available to new orders.
+    """
+
+    def __init__(self, cash=0.0, positions=None, fee=DEFAULT_FEE):
+        self.cash = float(cash)
+        self.positions = defaultdict(float, positions or {})
+        self.fee = fee
+        self._books = {}
+        self._resting = {}
+        self._holds = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def on_snapshot(self, snapshot):
+        """ on_snapshot replaces the book of snapshot's pair and matches resting orders """
+        with self._lock:
+            book = _Book(snapshot)
+            self._books[snapshot.pair] = book
+            for order in list(self._resting.values()):
+                if order.pair == snapshot.pair:
+                    self._match(order, book)
+
+    def refresh(self, api, pair):
+        """ refresh fetches pair's live book from kraken.API, for paper trading live """
+        res = api.query_public("Depth", data={"pair": pair})
+        self.on_snapshot(OrderbookSnapshot.from_depth(pair, res[pair]))
+
+    def replay(self, snapshots, callback=None):
+        """
+        replay feeds recorded snapshots in order, eg. from DAO.iter_orderbook_snapshots,
+        calling callback(snapshot) after each so a strategy can trade against it
+        returns the number of snapshots replayed
+        """
+        count = 0
+        for snapshot in snapshots:
+            self.on_snapshot(snapshot)
+            if callback is not None:
+                callback(snapshot)
+            count += 1
+        return count
+
+    def book(self, pair):
+        book = self._books.get(pair)
+        return None if book is None else book.snapshot
+
+    def open_orders(self):
+        with self._lock:
+            return list(self._resting.values())
+
+    def submit(self, order):
+        with self._lock:
+            order.txid = "PAPER-%d" % next(self._ids)
+            book = self._books.get(order.pair)
+            if order.order_type == MARKET:
+                self._submit_market(order, book)
+            else:
+                self._submit_limit(order, book)
+        logging.debug("Paper order %s", order)
+        return order
+
+    def cancel(self, order):
+        with self._lock:
+            if order.txid not in self._resting:
+                raise OrderError("order %s is not open" % order.txid)
+            self._close(order, CANCELED)
+        return order
+
+    def _reject(self, order, reason):
+        order.status = REJECTED
+        order.reason = reason
+
+    def _submit_market(self, order, book):
+        if book is None:
+            return self._reject(order, "no orderbook for %s" % order.pair)
+        take, volume, cost = book.quote(order.side, order.volume)
+        if volume <= VOLUME_EPSILON:
+            return self._reject(order, "no liquidity")
+        fee = cost * self.fee
+        if order.side == BUY:
+            if cost + fee > self.cash:
+                return self._reject(order, "insufficient funds")
+            self.cash -= cost + fee
+            self.positions[order.pair] += volume
+        else:
+            if order.volume > self.positions[order.pair] + VOLUME_EPSILON:
+                return self._reject(order, "insufficient funds")
+            self.cash += cost - fee
+            self.positions[order.pair] -= volume
+        book.consume(order.side, take)
+        order.add_fill(cost / volume, volume, fee, book.snapshot.snapshot_epoch)
+        order.status = CLOSED
+        if not order.is_filled:
+            order.reason = "book exhausted"
+
+    def _submit_limit(self, order, book):
+        if order.side == BUY:
+            hold = order.volume * order.price * (1 + self.fee)
+            if hold > self.cash:
+                return self._reject(order, "insufficient funds")
+            self.cash -= hold
+        else:
+            hold = order.volume
+            if hold > self.positions[order.pair] + VOLUME_EPSILON:
+                return self._reject(order, "insufficient funds")
+            self.positions[order.pair] -= hold
+        self._holds[order.txid] = hold
+        self._resting[order.txid] = order
+        order.status = OPEN
+        if book is not None:
+            self._match(order, book)
+
+    def _match(self, order, book):
+        take, volume, cost = book.quote(order.side, order.remaining, order.price)
+        if volume <= VOLUME_EPSILON:
+            return
+        book.consume(order.side, take)
+        fee = cost * self.fee
+        if order.side == BUY:
+            self._holds[order.txid] -= cost + fee
+            self.positions[order.pair] += volume
+        else:
+            self._holds[order.txid] -= volume
+            self.cash += cost - fee
+        order.add_fill(cost / volume, volume, fee, book.snapshot.snapshot_epoch)
+        if order.is_filled:
+            self._close(order, CLOSED)
+
+    def _close(self, order, status):
+        """ _close releases what is left of the order's hold, eg. after price improvement """
+        del self._resting[order.txid]
+        hold = self._holds.pop(order.txid)
+        if order.side == BUY:
+            self.cash += hold
+        else:
+            self.positions[order.pair] += hold
+        order.status = status
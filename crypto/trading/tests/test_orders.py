@@ -0,0 +1,207 @@
+import base64
+import hashlib
+import hmac
+import threading
+import urllib.parse
+
+import pytest
+
+import kraken
+from orderbook import OrderbookSnapshot
+from trading import (
+    Order,
+    OrderManager,
+    PaperExecutor,
+    KrakenExecutor,
+    BUY,
+    SELL,
+    LIMIT,
+    OPEN,
+    CLOSED,
+    CANCELED,
+    REJECTED,
+)
+
+PAIR = "XXBTZUSD"
+
+
+def make_snapshot(epoch, asks, bids):
+    depth = {
+        "asks": [[str(price), str(volume), epoch] for price, volume in asks],
+        "bids": [[str(price), str(volume), epoch] for price, volume in bids],
+    }
+    return OrderbookSnapshot.from_depth(PAIR, depth, epoch)
+
+
+@pytest.fixture
+def book():
+    return make_snapshot(
+        1000, asks=[(101, 1), (102, 2), (104, 5)], bids=[(100, 1), (99, 2), (97, 5)]
+    )
+
+
+def test_market_buy_walks_the_asks(book):
+    executor = PaperExecutor(cash=10000, fee=0.001)
+    executor.on_snapshot(book)
+    manager = OrderManager(executor)
+
+    order = manager.submit(PAIR, BUY, 2.5)
+    assert order.status == CLOSED
+    assert order.filled == pytest.approx(2.5)
+    assert order.average_price == pytest.approx((101 + 102 * 1.5) / 2.5)
+    assert executor.cash == pytest.approx(10000 - (101 + 153) * 1.001)
+    assert executor.positions[PAIR] == pytest.approx(2.5)
+
+    # the liquidity taken is gone until the next snapshot
+    order = manager.submit(PAIR, BUY, 1)
+    assert order.average_price == pytest.approx(103)
+    assert manager.latency_stats()["count"] == 2
+
+
+def test_rejections(book):
+    executor = PaperExecutor(cash=100)
+    manager = OrderManager(executor)
+    assert manager.submit(PAIR, BUY, 1).reason == "no orderbook for XXBTZUSD"
+
+    executor.on_snapshot(book)
+    assert manager.submit(PAIR, BUY, 1).status == REJECTED
+    assert manager.submit(PAIR, SELL, 1).status == REJECTED
+    assert executor.cash == 100
+
+
+def test_limit_order_rests_until_a_replayed_snapshot_crosses_it(book):
+    executor = PaperExecutor(cash=1000, fee=0)
+    manager = OrderManager(executor)
+    order = None
+
+    def strategy(snapshot):
+        nonlocal order
+        if order is None:
+            order = manager.submit(PAIR, BUY, 2, LIMIT, price=99)
+
+    snapshots = [
+        book,
+        make_snapshot(1001, asks=[(100, 1)], bids=[(98, 1)]),
+        make_snapshot(1002, asks=[(98.5, 0.5), (99, 3)], bids=[(98, 1)]),
+    ]
+    assert executor.replay(snapshots[:2], strategy) == 2
+    assert order.status == OPEN
+    assert executor.open_orders() == [order]
+    assert executor.cash == pytest.approx(1000 - 2 * 99)
+
+    executor.replay(snapshots[2:], strategy)
+    assert order.status == CLOSED
+    assert order.average_price == pytest.approx((98.5 * 0.5 + 99 * 1.5) / 2)
+    # price improvement is released from the hold
+    assert executor.cash == pytest.approx(1000 - order.cost)
+    assert executor.positions[PAIR] == pytest.approx(2)
+
+
+def test_cancel_releases_the_hold(book):
+    executor = PaperExecutor(positions={PAIR: 3}, fee=0)
+    executor.on_snapshot(book)
+    order = OrderManager(executor).submit(PAIR, SELL, 2, LIMIT, price=99.5)
+
+    assert order.status == OPEN
+    assert order.filled == pytest.approx(1)
+    assert executor.positions[PAIR] == pytest.approx(1)
+    executor.cancel(order)
+    assert order.status == CANCELED
+    assert executor.positions[PAIR] == pytest.approx(2)
+    assert executor.cash == pytest.approx(100)
+
+
+def test_nonces_are_unique_and_increasing_across_threads():
+    api = kraken.API()
+    nonces = [[] for _ in range(8)]
+
+    def draw(out):
+        for _ in range(2000):
+            out.append(api._nonce())
+
+    threads = [threading.Thread(target=draw, args=(out,)) for out in nonces]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(out == sorted(set(out)) for out in nonces)
+    assert len(set().union(*nonces)) == 8 * 2000
+
+
+def test_signature_matches_kraken_scheme():
+    secret = base64.b64encode(b"not a real secret").decode()
+    api = kraken.API("key", secret)
+    data = {"nonce": 1234, "pair": PAIR}
+    urlpath = "/0/private/AddOrder"
+
+    encoded = ("1234" + urllib.parse.urlencode(data)).encode()
+    message = urlpath.encode() + hashlib.sha256(encoded).digest()
+    expected = hmac.new(base64.b64decode(secret), message, hashlib.sha512)
+    assert api._sign(data, urlpath) == base64.b64encode(expected.digest()).decode()
+    assert api._sign(data, urlpath) == base64.b64encode(expected.digest()).decode()
+
+    api.secret = base64.b64encode(b"another secret").decode()
+    assert api._sign(data, urlpath) != base64.b64encode(expected.digest()).decode()
+
+
+class FakeAPI(object):
+    """ FakeAPI answers AssetPairs and QueryOrders and records the private queries made """
+
+    def __init__(self):
+        self.public = []
+        self.private = []
+        self.orders = {}
+
+    def query_public(self, method, data=None):
+        self.public.append(method)
+        return {PAIR: {"altname": "XBTUSD", "pair_decimals": 1, "lot_decimals": 8}}
+
+    def query_private(self, method, data=None):
+        self.private.append((method, data))
+        if method == "QueryOrders":
+            return {txid: self.orders[txid] for txid in data["txid"].split(",")}
+        return {"txid": ["TXID"], "descr": {}}
+
+
+def test_kraken_orders_use_the_pair_precision():
+    api = FakeAPI()
+    executor = KrakenExecutor(api, validate=True)
+    executor.submit(Order(PAIR, BUY, 0.123456789, LIMIT, price=6543.21987))
+    executor.submit(Order(PAIR, SELL, 2, LIMIT, price=6600))
+
+    assert api.public == ["AssetPairs"]
+    (_, first), (_, second) = api.private
+    assert (first["price"], first["volume"]) == ("6543.2", "0.12345679")
+    assert (second["price"], second["volume"]) == ("6600.0", "2.00000000")
+
+
+def test_kraken_orders_are_refreshed_from_query_orders():
+    api = FakeAPI()
+    executor = KrakenExecutor(api)
+    order = executor.submit(Order(PAIR, BUY, 2, LIMIT, price=100))
+    assert order.status == OPEN
+
+    api.orders["TXID"] = {
+        "status": "open",
+        "vol_exec": "0.5",
+        "cost": "50",
+        "fee": "0.1",
+    }
+    assert executor.refresh([order]) == [order]
+    assert executor.refresh([order]) == []
+    api.orders["TXID"] = {
+        "status": "closed",
+        "vol_exec": "2",
+        "cost": "197",
+        "fee": "0.4",
+        "closetm": 1000.5,
+    }
+    assert executor.refresh([order]) == [order]
+
+    assert order.status == CLOSED
+    assert order.is_filled
+    assert [fill.price for fill in order.fills] == [100, 98]
+    assert order.cost == pytest.approx(197)
+    assert order.fee == pytest.approx(0.4)
+    assert order.fills[-1].epoch == 1000.5
@@ -5,9 +5,8 @@ from .utils import (
     get_data_path,
     Timeframe,
     seek_interval_start,
-    pairs,
-    consts,
 )
+from . import pairs, consts
 
 __all__ = [
     "get_data_path",
@@ -1,2 +1,46 @@
 PAIR_ETH_USD = "XETHZUSD"
 PAIR_XBT_USD = "XXBTZUSD"
+PAIR_LTC_USD = "XLTCZUSD"
+PAIR_XRP_USD = "XXRPZUSD"
+PAIR_XLM_USD = "XXLMZUSD"
+PAIR_XMR_USD = "XXMRZUSD"
+PAIR_ETC_USD = "XETCZUSD"
+PAIR_ZEC_USD = "XZECZUSD"
+PAIR_REP_USD = "XREPZUSD"
+PAIR_XDG_USD = "XDGUSD"
+PAIR_BCH_USD = "BCHUSD"
+PAIR_DASH_USD = "DASHUSD"
+PAIR_EOS_USD = "EOSUSD"
+PAIR_XTZ_USD = "XTZUSD"
+PAIR_ADA_USD = "ADAUSD"
+PAIR_ATOM_USD = "ATOMUSD"
+PAIR_LINK_USD = "LINKUSD"
+PAIR_DOT_USD = "DOTUSD"
+PAIR_ALGO_USD = "ALGOUSD"
+PAIR_SOL_USD = "SOLUSD"
+PAIR_USDT_USD = "USDTZUSD"
+
+# every pair above, in Kraken's naming, for runs over all collected pairs
+ALL_PAIRS = [
+    PAIR_XBT_USD,
+    PAIR_ETH_USD,
+    PAIR_LTC_USD,
+    PAIR_XRP_USD,
+    PAIR_XLM_USD,
+    PAIR_XMR_USD,
+    PAIR_ETC_USD,
+    PAIR_ZEC_USD,
+    PAIR_REP_USD,
+    PAIR_XDG_USD,
+    PAIR_BCH_USD,
+    PAIR_DASH_USD,
+    PAIR_EOS_USD,
+    PAIR_XTZ_USD,
+    PAIR_ADA_USD,
+    PAIR_ATOM_USD,
+    PAIR_LINK_USD,
+    PAIR_DOT_USD,
+    PAIR_ALGO_USD,
+    PAIR_SOL_USD,
+    PAIR_USDT_USD,
+]
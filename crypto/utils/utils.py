@@ -1,3 +1,4 @@
+import os
 import pathlib
 from datetime import datetime
 import math
@@ -5,10 +6,18 @@ import logging
 from enum import Enum
 
 
+DATA_DIR_ENV = "CRYPTO_DATA_DIR"
+
+
 def get_data_path(filename):
-    """ get_data_path takes a filename and turns it into an absolute path in the data folder """
-    data_directory = str(pathlib.Path(__file__).parent.parent.absolute()) + "/data/"
-    return data_directory + filename
+    """
+    get_data_path takes a filename and turns it into an absolute path in the data folder
+    The data folder can be overridden with the CRYPTO_DATA_DIR environment variable
+    """
+    data_directory = os.environ.get(DATA_DIR_ENV)
+    if not data_directory:
+        data_directory = str(pathlib.Path(__file__).parent.parent.absolute()) + "/data/"
+    return os.path.join(data_directory, filename)
 
 
 def seek_interval_start(seconds, timeframe):
@@ -6,35 +6,58 @@ import time
 import csv
 import pathlib
 
-from crypto.utils import get_data_path
-from crypto.utils import consts
-from crypto.utils import pairs
-import crypto.kraken as kraken
+from utils import get_data_path
+from utils import consts
+from utils import pairs
+from database import DAO
+import archive
+import kraken
 
 FILE_END_SEEK_OFFSET = -1024
+# collector_uptime source of the windows fetched here
+UPTIME_SOURCE = "trades"
 
 
-def get_last_trade_index(csv_file_path):
+def get_last_trade_index(csv_file_path, pair=None):
+    """
+    get_last_trade_index returns the Trades cursor of the last trade in csv_file_path
+    When it has no trades, e.g. after archive_trades pruned it, the end of pair's
+    archived trades is used instead
+    """
     logging.debug(csv_file_path)
 
-    if not pathlib.Path(csv_file_path).exists():
+    last_trade = None
+    if pathlib.Path(csv_file_path).exists():
+        with open(csv_file_path, "rb") as f:
+            try:
+                f.seek(FILE_END_SEEK_OFFSET, 2)
+            except OSError:
+                # shorter than the offset
+                f.seek(0)
+            for line in reversed(f.readlines()):
+                try:
+                    last_trade = float(line.decode().split(",")[2])
+                    break
+                except (ValueError, IndexError):
+                    # header or truncated line
+                    continue
+
+    if last_trade is None and pair is not None:
+        last_trade = archive.last_archived_time(pair, archive.TRADES)
+        if last_trade is not None:
+            logging.info(f"No trades in {csv_file_path}, resuming from the archive")
+    if last_trade is None:
         return str(0)
 
-    with open(csv_file_path, "rb") as f:
-        try:
-            f.seek(FILE_END_SEEK_OFFSET, 2)
-        except:
-            return str(0)
-
-        last_trade = f.readlines()[-1].decode()
-        last_timestamp = str(int(float(last_trade.split(",")[2]) * 10000) * 10 ** 5)
-        logging.debug("Last trade from file %s: %s", csv_file_path, str(last_timestamp))
-        return last_timestamp
+    last_timestamp = str(int(last_trade * 10000) * 10 ** 5)
+    logging.debug("Last trade from file %s: %s", csv_file_path, str(last_timestamp))
+    return last_timestamp
 
 
 def get_all_trades(pair=pairs.PAIR_XBT_USD, append=True):
     c = kraken.API()
-    r = c.query_public("Time")
+    dao = DAO()
+    dao.create_tables()
 
     csv_file_path = get_data_path(pair + consts.TRADES_AFFIX)
     logging.debug(csv_file_path)
@@ -47,10 +70,15 @@ def get_all_trades(pair=pairs.PAIR_XBT_USD, append=True):
                 ["price", "volume", "time", "buy/sell", "market/limit", "misc"]
             )
 
-        last = get_last_trade_index(csv_file_path)
+        last = get_last_trade_index(csv_file_path, pair)
         logging.info(f"Getting all trades for {pair} as of time {last}")
 
         logging.info(f"starting retrieval from timestamp {last}")
+        # every trade after the cursor is fetched, so the window up to the
+        # last cursor is recorded as covered for gaps.classify_gaps
+        uptime_id = dao.insert_uptime(
+            UPTIME_SOURCE, pair, int(last) / 1e9, int(last) / 1e9
+        )
         count = 0
         while True:
             if c.at_api_limit():
@@ -67,9 +95,12 @@ def get_all_trades(pair=pairs.PAIR_XBT_USD, append=True):
             count += len(trades)
             logging.info("Received %s trades", count)
             if not trades:
+                dao.extend_uptime(uptime_id, time.time())
                 break
             for trade in trades:
                 writer.writerow(trade)
+            f.flush()
+            dao.extend_uptime(uptime_id, int(last) / 1e9)
 
         logging.info("Finished getting trades for %s", pair)
         logging.info("Total number of trades: %d", count)
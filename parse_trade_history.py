@@ -5,8 +5,12 @@ import csv
 from datetime import datetime
 
 from utils import get_data_path, Timeframe, seek_interval_start, consts, pairs
+import archive
 
 INTERPOLATE = True
+# last ohlcv column, 1 for candles interpolated over intervals without trades
+REAL = 0
+SYNTHETIC = 1
 
 
 def aggregate_ohlcv(trades):
@@ -24,7 +28,15 @@ def aggregate_ohlcv(trades):
     return [o, h, l, c, v]
 
 
-def resample_trade_data(pair=pairs.PAIR_XBT_USD, timeframe=Timeframe.M5):
+def resample_trade_data(
+    pair=pairs.PAIR_XBT_USD, timeframe=Timeframe.M5, start=None, end=None,
+):
+    """
+    resample_trade_data aggregates the trades of pair into ohlcv candles of timeframe
+    [interval_start, open, high, low, close, volume, synthetic]
+    The trades in [start, end) are read with archive.open_trades, out of the compressed
+    archive for the months archive_trades pruned from _trades.csv and then the csv
+    """
     logging.info(f"Analyzing trade data for pair {pair}, with interval {timeframe}")
 
     raw_data_csv_path = get_data_path(pair + consts.TRADES_AFFIX)
@@ -38,7 +50,7 @@ def resample_trade_data(pair=pairs.PAIR_XBT_USD, timeframe=Timeframe.M5):
 
     interval_start = None
     aggregate = []
-    with open(raw_data_csv_path, "r") as raw_f:
+    with archive.open_trades(pair, start, end, raw_data_csv_path) as raw_f:
         with open(ohlcv_output_csv_path, "w") as output_f:
             reader = csv.reader(raw_f)
             ohlcv_writer = csv.writer(output_f)
@@ -58,6 +70,7 @@ def resample_trade_data(pair=pairs.PAIR_XBT_USD, timeframe=Timeframe.M5):
                         f"ohlcv: {ohlcv}, interval ending in: {datetime.utcfromtimestamp(interval_start)}"
                     )
                     ohlcv.insert(0, interval_start)
+                    ohlcv.append(REAL)
                     ohlcv_writer.writerow(ohlcv)
                     aggregate.clear()
                     aggregate.append(row)
@@ -71,7 +84,7 @@ def resample_trade_data(pair=pairs.PAIR_XBT_USD, timeframe=Timeframe.M5):
                             (next_interval_start - interval_start)
                             / timeframe.to_seconds()
                         )
-                        prev_close = ohlcv[3]
+                        prev_close = ohlcv[4]
                         next_open = float(row[0])
                         jump = (next_open - prev_close) / (skipped_periods + 1)
                         logging.debug(
@@ -84,8 +97,10 @@ def resample_trade_data(pair=pairs.PAIR_XBT_USD, timeframe=Timeframe.M5):
                             # or not... maybe we can interpolate here for skipped values
                             # logging.info(f'ohlcv: {ohlcv}, interval ending in: {datetime.utcfromtimestamp(interval_start)}')
                             interpolated_ohlcv += jump
-                            to_write = [interpolated_ohlcv for _ in range(5)]
+                            # nothing traded, so no volume
+                            to_write = [interpolated_ohlcv for _ in range(4)] + [0.0]
                             to_write.insert(0, interval_start)
+                            to_write.append(SYNTHETIC)
                             ohlcv_writer.writerow(to_write)
                             interval_start += timeframe.to_seconds()
 